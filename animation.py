@@ -0,0 +1,43 @@
+from array import array
+
+from .direction import FACING_COUNT
+
+
+class Animation:
+    """
+    Frame table for a sprite, indexed by facing and frame.
+
+    Every entry is a sprite sheet offset plus sprite flags, stored in flat arrays
+    at facing * frame_count + frame, so picking the image for a frame is a
+    couple of integer operations and no allocation.
+    """
+
+    frame_count: int
+    ticks_per_frame: int
+    graphics_x: array
+    graphics_y: array
+    flags: bytearray
+
+    def __init__(self, frame_count: int = 1, ticks_per_frame: int = 1):
+        n = FACING_COUNT * frame_count
+        self.frame_count = frame_count
+        self.ticks_per_frame = ticks_per_frame
+        self.graphics_x = array("H", bytes(2 * n))
+        self.graphics_y = array("H", bytes(2 * n))
+        self.flags = bytearray(n)
+
+    def set_frame(
+        self, facing: int, frame: int, graphics_x: int, graphics_y: int, flags: int
+    ) -> None:
+        """Define one frame of the cycle for a facing (see DirectionTuple.index)."""
+        i = facing * self.frame_count + frame
+        self.graphics_x[i] = graphics_x
+        self.graphics_y[i] = graphics_y
+        self.flags[i] = flags
+
+    def entry(self, facing: int, tick: int) -> int:
+        """Table entry to show for a facing at an animation tick."""
+        return (
+            facing * self.frame_count
+            + (tick // self.ticks_per_frame) % self.frame_count
+        )
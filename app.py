@@ -1,21 +1,65 @@
 # pyright: reportUnusedCallResult=false
 
+import asyncio
 import random
-from sasppu import Sprite
 
 
 from app import SASPPUApp
 import sasppu
-import time
 
-from events.input import BUTTON_TYPES, ButtonDownEvent, Buttons
 from system.eventbus import eventbus
 from system.scheduler.events import RequestStopAppEvent
 
 
-from .direction import Direction, DirectionTuple
+from .controls import (
+    Controls,
+    DIRECTIONS,
+    INPUT_TABLE,
+    STILL,
+    DIRECTION_MASK,
+    ACTION_SHIFT,
+    ACTION_SPECIAL,
+)
 from .player import Player
 from .world import World  # camera and world management
+from .shadow_oam import ShadowOAM
+from .oam_pool import OAMPool
+from .kinds import KIND_TREE, KIND_CAVE, KIND_POO
+from .tilemap import TileMap, blit_from_sheet
+from .asset_loader import AssetLoader
+from .replay import InputRecorder, InputPlayer
+from .effects import Effects
+from .scheduler import FixedStep
+from .snapshot import Snapshot
+from .startup import (
+    Startup,
+    STAGE_COUNT,
+    STAGE_BACKGROUND,
+    STAGE_SHEET,
+    STAGE_WORLD,
+    STAGE_INTRO,
+)
+from .trace import (
+    tracer,
+    trace,
+    TRACE_WARN,
+    TRACE_INFO,
+    EV_REPLAY,
+    EV_CREATE,
+    EV_INIT_SPRITE,
+    EV_STARTUP_STAGE,
+    EV_FIRST_FRAME,
+    EV_STARTUP_DONE,
+)
+from .profiler import (
+    FrameProfiler,
+    ProfilerHUD,
+    PHASE_INPUT,
+    PHASE_MOVE,
+    PHASE_WORLD,
+    PHASE_OAM,
+    PHASE_RENDER,
+)
 from .constants import (
     SPRITE_WIDTH,
     SPRITE_HEIGHT,
@@ -23,17 +67,63 @@ from .constants import (
     SCREEN_HEIGHT,
     ASSET_PATH,
     SPRITE_FILENAME,
+    SCENERY_IN_TILEMAP,
+    CHUNKED_WORLD_SEED,
+    CHUNK_TILES,
+    VIEW_DISTANCE_CHUNKS,
+    PROFILE_FRAMES,
+    PROFILE_HUD,
+    HUD_GRAPHICS_X,
+    HUD_GRAPHICS_Y,
+    REPLAY_MODE,
+    REPLAY_PATH,
+    INTRO_FRAMES,
+    SIM_TICK_US,
+    SIM_MAX_STEPS,
+    SIM_MAX_SKIPPED_RENDERS,
+    SIM_LOCKSTEP,
+    IDLE_TICKS,
+    SNAPSHOT_PATH,
+    STARTUP_SLICE_US,
+    FIRST_FRAME_BUDGET_US,
+    TRACE_LEVEL,
 )
 
 
 class SASPPUTest(SASPPUApp):
-    # entities
+    # the player; world objects are entity ids in World.entities, and only
+    # hold an OAM slot while on screen
     player: Player
-    caves: list[Sprite] = []
-    trees: list[Sprite] = []
-    poos: list[Sprite] = []
     # camera/world
     world: World
+    # static scenery drawn into bg0, if SCENERY_IN_TILEMAP
+    tilemap: TileMap | None
+    # scenery images on the sprite sheet -> where they go in background graphics
+    # (graphics_x, graphics_y, bg_x, bg_y); the ground tile stays at bg (0, 0)
+    scenery_tiles = (
+        (SPRITE_WIDTH * 2, 0, SPRITE_WIDTH, 0),  # tree
+        (SPRITE_WIDTH * 3, 0, SPRITE_WIDTH * 2, 0),  # cave
+    )
+    # python-side copy of sasppu.oam, flushed once per frame
+    shadow: ShadowOAM
+    # allocator for the OAM slots above
+    pool: OAMPool
+    # button bitmask, updated from button events
+    controls: Controls
+    # input log being written or played back, if REPLAY_MODE
+    recorder: InputRecorder | None
+    replay: InputPlayer | None
+    # frame phase timings, if PROFILE_FRAMES, and their overlay if PROFILE_HUD
+    profiler: FrameProfiler | None
+    hud: ProfilerHUD | None
+    # HDMA driven fades, wipes and wobbles
+    effects: Effects
+    # world and player state, saved when the app goes idle and restored at startup
+    snapshot: Snapshot
+    # fixed simulation tick, decoupled from the frame rate
+    clock: FixedStep
+    # loading left for after the first frame, and how long startup took
+    startup: Startup
     # state
     request_fast_updates: bool
     exit: bool
@@ -42,19 +132,30 @@ class SASPPUTest(SASPPUApp):
     bg0: sasppu.Background
 
     @property
-    def all_sprites(self) -> list[Sprite]:
-        """Return a list of all sprites in the app."""
-        return [self.player.sprite] + self.trees + self.caves + self.poos
+    def all_sprites(self) -> memoryview:
+        """Return the OAM slots of all sprites in the app (a view, not a copy)."""
+        return self.pool.live()
 
     @property
-    def all_sprites_non_player(self) -> list[Sprite]:
-        """Return a list of all sprites except the player."""
-        return self.trees + self.caves + self.poos
+    def all_sprites_non_player(self):
+        """Iterate over the OAM slots of all sprites except the player
+        (i.e. the world objects currently on screen)."""
+        player_slot = self.player.slot
+        return (slot for slot in self.pool.live() if slot != player_slot)
 
     def __init__(self):
+        self.startup = Startup(STARTUP_SLICE_US, FIRST_FRAME_BUDGET_US)
         super().__init__()
-        self.button_states = Buttons(self)
+        self.controls = Controls(self)
+        self.init_replay()
         self.request_fast_updates = True
+        self.clock = FixedStep(
+            SIM_TICK_US,
+            max_steps=SIM_MAX_STEPS,
+            max_skipped_renders=SIM_MAX_SKIPPED_RENDERS,
+            idle_ticks=IDLE_TICKS,
+            lockstep=SIM_LOCKSTEP,
+        )
         self.exit = False
         self.ms = sasppu.MainState()
         self.ms.bind()
@@ -62,22 +163,50 @@ class SASPPUTest(SASPPUApp):
         self.cs.bind()
         self.bg0 = sasppu.Background()
         self.bg0.bind(0)
+        self.shadow = ShadowOAM()
+        self.pool = OAMPool(self.shadow.count)
+        world_size_tiles = (8, 8)
+        if CHUNKED_WORLD_SEED is not None:
+            # effectively unbounded; chunks are only generated where the player goes
+            world_size_tiles = (0x7FFF, 0x7FFF)
+        self.tilemap = None
+        if SCENERY_IN_TILEMAP:
+            self.tilemap = TileMap(
+                background=self.bg0,
+                tile_size=SPRITE_WIDTH,
+                world_size_tiles=world_size_tiles,
+            )
+            for graphics_x, graphics_y, bg_x, bg_y in self.scenery_tiles:
+                self.tilemap.define_tile(graphics_x, graphics_y, bg_x, bg_y)
         self.init_player()
-        self.init_trees()
-        self.init_caves()
-        self.init_poos()
         # setup world camera
         # use SCREEN_WIDTH/HEIGHT from sasppu for world dimensions
         self.world = World(
             tile_size=SPRITE_WIDTH,
-            world_size_tiles=(8, 8),
+            world_size_tiles=world_size_tiles,
             screen_width=SCREEN_WIDTH,
             screen_height=SCREEN_HEIGHT,
+            oam=self.shadow,
+            pool=self.pool,
+            tilemap=self.tilemap,
+            seed=CHUNKED_WORLD_SEED,
+            chunk_tiles=CHUNK_TILES,
+            view_distance=VIEW_DISTANCE_CHUNKS,
         )
         self.world.set_player(self.player)
-        # register world objects
-        for obj in self.all_sprites_non_player:
-            self.world.register_object_random(obj)
+        self.profiler = None
+        self.hud = None
+        if PROFILE_FRAMES:
+            self.profiler = FrameProfiler(PROFILE_FRAMES)
+            if PROFILE_HUD:
+                self.hud = ProfilerHUD(
+                    self.profiler,
+                    self.shadow,
+                    self.pool,
+                    HUD_GRAPHICS_X,
+                    HUD_GRAPHICS_Y,
+                )
+        self.snapshot = Snapshot(self.world, self.player)
 
         self.ms.mainscreen_colour = sasppu.TRANSPARENT_BLACK
         self.ms.flags = (
@@ -91,6 +220,8 @@ class SASPPUTest(SASPPUApp):
             | sasppu.CMathState.HALF_MAIN_SCREEN
             | sasppu.CMathState.FADE_ENABLE
         )
+        # black until startup is done, so half-loaded frames are not seen
+        self.cs.fade = 255
         self.ms.bgcol_windows = (
             ((sasppu.WINDOW_B | sasppu.WINDOW_AB) << 4)
             | sasppu.WINDOW_A
@@ -106,23 +237,116 @@ class SASPPUTest(SASPPUApp):
         self.ms.window_1_right = 200
         self.ms.window_2_left = 180
         self.ms.window_2_right = 230
+        self.effects = Effects(self.ms, self.cs, self.bg0)
 
-        with open(ASSET_PATH + SPRITE_FILENAME, "rb") as f:
-            data = f.read()
-            sasppu.blit_sprite(0, 0, SPRITE_WIDTH * 4, SPRITE_HEIGHT * 2, data, False)
+        # the rest is loaded over the first frames, from run()
+        self.startup.add(STAGE_BACKGROUND, self.init_background)
+        self.startup.add(STAGE_SHEET, self.load_sheet)
+        self.startup.add(STAGE_WORLD, self.init_world)
+        self.startup.add(STAGE_INTRO, self.start_intro)
 
         # with open(ASSET_PATH + "bg.bin", "rb") as f:
         #    sasppu.blit_background(0, 0, 256, 256, f.read())
-        # with open(ASSET_PATH + "spr.bin", "rb") as f:
-        #     sasppu.blit_sprite(104, 104, 32 * 8, 32, f.read())
+        # loader.blit(ASSET_PATH + "spr.bin", 104, 104)
 
+    def init_background(self):
         green_bg_color = sasppu.rgb555(1, 12, 1)  # RGB555 goes from 0 to 31
         sasppu.fill_background(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, green_bg_color)
 
+    def load_sheet(self):
+        """Stream the sheet in bands through a fixed-size buffer rather than
+        reading the whole file into RAM, one band per step."""
+        loader = AssetLoader()
+        for row, rows, data in loader.bands(
+            ASSET_PATH + SPRITE_FILENAME,
+            width=SPRITE_WIDTH * 4,
+            height=SPRITE_HEIGHT * 2,
+        ):
+            self._load_sheet_band(row, rows, data)
+            yield
+
+    def init_world(self):
+        """Restore the saved world, or make a new one."""
+        if not self.snapshots_enabled or not self.snapshot.restore(SNAPSHOT_PATH):
+            self.init_world_objects()
+
+    def start_intro(self):
+        """Start the opening transition, or just show the picture."""
+        self.cs.fade = 0
+        if INTRO_FRAMES:
+            # place the camera first: the wobble keeps the scroll it starts with
+            self.world.update()
+            self.effects.fade(INTRO_FRAMES)
+            self.effects.wipe(INTRO_FRAMES)
+            self.effects.wobble(INTRO_FRAMES)
+            # the fade takes over from the next frame on, still black
+            self.effects.update()
+
+    async def start(self, render_update):
+        """Render frames while the startup stages run in the time left over,
+        then report how long startup took."""
+        startup = self.startup
+        while not startup.done and not self.exit:
+            self.shadow.flush()
+            await render_update()
+            startup.end_frame()
+            startup.step()
+        if TRACE_LEVEL >= TRACE_INFO:
+            for stage in range(STAGE_COUNT):
+                trace(
+                    EV_STARTUP_STAGE,
+                    stage,
+                    startup.stage_us[stage],
+                    startup.stage_frames[stage],
+                )
+            trace(EV_STARTUP_DONE, startup.ready_us, startup.frames)
+        if TRACE_LEVEL >= (TRACE_WARN if startup.over_budget else TRACE_INFO):
+            trace(EV_FIRST_FRAME, startup.first_frame_us, startup.budget_us)
+        # print what startup traced, before the frame loop starts
+        tracer.dump()
+
+    def init_replay(self):
+        """Set up recording or replay, seeding the RNG before anything random
+        happens so placement comes out the same on replay."""
+        self.recorder = None
+        self.replay = None
+        if REPLAY_MODE == "replay":
+            self.replay = InputPlayer.load(REPLAY_PATH)
+            seed = self.replay.seed
+        elif REPLAY_MODE == "record":
+            seed = random.getrandbits(30)
+            self.recorder = InputRecorder(seed)
+        else:
+            return
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_REPLAY, self.replay is not None, seed)
+        random.seed(seed)
+
+    def _load_sheet_band(self, row: int, rows: int, data: memoryview):
+        """Blit one band of the sprite sheet, and the part of the scenery images
+        in it onto the green background if scenery goes into the tilemap."""
+        sheet_width = SPRITE_WIDTH * 4
+        sasppu.blit_sprite(0, row, sheet_width, rows, data, False)
+        if self.tilemap is None:
+            return
+        for graphics_x, graphics_y, bg_x, bg_y in self.scenery_tiles:
+            top = max(row, graphics_y)
+            bottom = min(row + rows, graphics_y + SPRITE_HEIGHT)
+            if top >= bottom:
+                continue
+            blit_from_sheet(
+                data,
+                sheet_width,
+                graphics_x,
+                top - row,
+                SPRITE_WIDTH,
+                bottom - top,
+                bg_x,
+                bg_y + top - graphics_y,
+            )
+
     def init_player(self):
-        spr = sasppu.oam[0]
-        spr: Sprite = self.init_sprite(
-            oam=0,
+        slot = self.init_sprite(
             x=104,
             y=104,
             width=SPRITE_WIDTH,
@@ -130,85 +354,64 @@ class SASPPUTest(SASPPUApp):
             graphics_x=0,
             graphics_y=0,
         )
-        self.player = Player(with_sprite=spr, graphics_x=0)
+        self.player = Player(oam=self.shadow, slot=slot, graphics_x=0)
+
+    def init_world_objects(self):
+        """Create the trees, caves and poos of a new fixed world and scatter
+        them (a chunked world generates its own)."""
+        if CHUNKED_WORLD_SEED is not None:
+            return
+        # cave flips are drawn before anything is placed, so a seed (and a
+        # recorded replay) always gives the same world
+        cave_flips = [random.choice([True, False]) for _ in range(5)]
+        self.init_trees()
+        self.init_caves(cave_flips)
+        self.init_poos()
 
     def init_trees(self, n: int = 20):
-        self.trees = []
-        # create tree sprites; world placement will assign positions
-        start = len(self.all_sprites)
-        print(f"start at {start} for {n} trees, end at {start + n}")
-        for i in range(start, start + n):
-            spr = self.init_sprite(
-                oam=i,
-                x=0,
-                y=0,
-                width=SPRITE_WIDTH,
-                height=SPRITE_HEIGHT,
-                graphics_x=SPRITE_WIDTH * 2,
-                graphics_y=0,
-            )
-            self.trees.append(spr)
-
-    def init_caves(self, n: int = 5):
-        self.caves = []
-        # create tree sprites; world placement will assign positions
-        start = len(self.all_sprites)
-        print(f"start at {start} for {n} trees, end at {start + n}")
-        for i in range(start, start + n):
-            spr = self.init_sprite(
-                oam=i,
-                x=0,
-                y=0,
-                width=SPRITE_WIDTH,
-                height=SPRITE_HEIGHT,
-                graphics_x=SPRITE_WIDTH * 3,
-                graphics_y=0,
-            )
-            flip_x = random.choice([True, False])
-            if flip_x:
-                spr.flags = spr.FLIP_X + spr.ENABLED
-            self.caves.append(spr)
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_CREATE, n, KIND_TREE)
+        for _ in range(n):
+            self.world.register_object_random(KIND_TREE)
+
+    def init_caves(self, flips: list[bool]):
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_CREATE, len(flips), KIND_CAVE)
+        for flip_x in flips:
+            self.world.register_object_random(KIND_CAVE, sasppu.FLIP_X if flip_x else 0)
 
     def init_poos(self, n: int = 10):
-        self.poos = []
-        # create poo sprites; world placement will assign positions
-        start = len(self.all_sprites)
-        print(f"start at {start} for {n} poos, end at {start + n}")
-        for i in range(start, start + n):
-            spr = self.init_sprite(
-                oam=i,
-                x=0,
-                y=0,
-                width=SPRITE_WIDTH,
-                height=SPRITE_HEIGHT,
-                graphics_x=0,
-                graphics_y=SPRITE_HEIGHT * 1,
-            )
-            self.poos.append(spr)
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_CREATE, n, KIND_POO)
+        for _ in range(n):
+            self.world.register_object_random(KIND_POO)
 
     def init_sprite(
         self,
-        oam: int,
         x: int,
         y: int,
         width: int,
         height: int,
         graphics_x: int = 0,
         graphics_y: int = 0,
-    ):
-        print(
-            f"placing sprite at ({x}, {y}) with graphics ({graphics_x}, {graphics_y})"
+    ) -> int:
+        """Acquire an OAM slot from the pool, set it up in the shadow OAM and
+        return it."""
+        oam = self.pool.acquire()
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_INIT_SPRITE, oam, x, y, graphics_x, graphics_y)
+        self.shadow.init(
+            oam,
+            x=x,
+            y=y,
+            width=width,
+            height=height,
+            graphics_x=graphics_x,
+            graphics_y=graphics_y,
+            windows=sasppu.WINDOW_ALL,
+            flags=sasppu.ENABLED,
         )
-        spr = sasppu.oam[oam]
-        spr.width = width
-        spr.height = height
-        spr.graphics_x = graphics_x
-        spr.graphics_y = graphics_y
-        spr.x = x
-        spr.y = y
-        spr.windows = sasppu.WINDOW_ALL
-        spr.flags = spr.ENABLED
-        return spr
+        return oam
 
     def get_random_position(self):
         import random
@@ -217,84 +420,121 @@ class SASPPUTest(SASPPUApp):
         y = random.randint(20, 220)
         return x, y
 
+    @property
+    def snapshots_enabled(self) -> bool:
+        """Whether the world is restored at startup and saved for the next
+        launch. Not while recording or replaying a log: those always start
+        from the world the log's seed generates."""
+        return (
+            SNAPSHOT_PATH is not None and self.replay is None and self.recorder is None
+        )
+
+    def save_snapshot(self):
+        """Save the world for the next launch (not before it is loaded)."""
+        if self.snapshots_enabled and self.startup.done:
+            self.snapshot.save(SNAPSHOT_PATH)
+
     def _cleanup(self):
-        eventbus.remove(ButtonDownEvent, self._handle_buttondown, self)
+        self.controls.remove()
+        self.effects.stop()
+        self.save_snapshot()
+        tracer.dump()
+        if self.recorder is not None:
+            self.recorder.save(REPLAY_PATH)
+        if self.profiler is not None:
+            # print the timings so runs of different builds can be compared
+            self.profiler.dump()
         self.exit = True
         self.minimise()
 
+    def step(self) -> None:
+        """Simulate one fixed tick: read the buttons, move, run the effects."""
+        mask = self.controls.mask
+        replay = self.replay
+        if replay is not None:
+            if replay.done:
+                self._cleanup()
+                return
+            mask = replay.next()
+        elif self.recorder is not None:
+            self.recorder.record(mask)
+        busy = self.effects.busy
+        if busy:
+            # hold still while a transition plays
+            mask = 0
+        self.clock.activity(busy or mask != 0)
+        # one table lookup resolves the held buttons to a move and an action
+        entry = INPUT_TABLE[mask]
+        direction = entry & DIRECTION_MASK
+        if self.profiler is not None:
+            self.profiler.mark(PHASE_INPUT)
+        if direction != STILL:
+            self.player.move(DIRECTIONS[direction])
+        if entry >> ACTION_SHIFT == ACTION_SPECIAL:
+            self.special_action()
+        self.effects.update()
+        if self.profiler is not None:
+            self.profiler.mark(PHASE_MOVE)
+
     async def run(self, render_update):
+        await self.start(render_update)
+        profiler = self.profiler
+        clock = self.clock
+        clock.reset()
         while not self.exit:
-            movement_button_states: dict[Direction, bool] = {
-                DirectionTuple.N: self.button_states.get(BUTTON_TYPES["CANCEL"])
-                and self.button_states.get(BUTTON_TYPES["RIGHT"]),
-                DirectionTuple.S: self.button_states.get(BUTTON_TYPES["LEFT"])
-                and self.button_states.get(BUTTON_TYPES["CONFIRM"]),
-                DirectionTuple.E: self.button_states.get(BUTTON_TYPES["RIGHT"])
-                and self.button_states.get(BUTTON_TYPES["CONFIRM"]),
-                DirectionTuple.W: self.button_states.get(BUTTON_TYPES["CANCEL"])
-                and self.button_states.get(BUTTON_TYPES["LEFT"]),
-            }
-
-            if not (
-                movement_button_states.get(DirectionTuple.N)
-                or movement_button_states.get(DirectionTuple.S)
-                or movement_button_states.get(DirectionTuple.E)
-                or movement_button_states.get(DirectionTuple.W)
-            ):
-                # only calculate diagonal movement if no cardinal direction is pressed
-                diagonal_movement_button_states: dict[Direction, bool] = {
-                    DirectionTuple.NW: self.button_states.get(BUTTON_TYPES["CANCEL"]),
-                    DirectionTuple.NE: self.button_states.get(BUTTON_TYPES["RIGHT"]),
-                    DirectionTuple.SW: self.button_states.get(BUTTON_TYPES["LEFT"]),
-                    DirectionTuple.SE: self.button_states.get(BUTTON_TYPES["CONFIRM"]),
-                }
-                movement_button_states.update(diagonal_movement_button_states)
-
-            for direction, pressed in movement_button_states.items():
-                if pressed:
-                    self.player.move(direction)
-
-            if self.button_states.get(BUTTON_TYPES["UP"]):
-                pass
-            elif self.button_states.get(BUTTON_TYPES["DOWN"]):
-                self.special_action()
-
-            # self.button_states.clear()
-
+            if profiler is not None:
+                profiler.begin_frame()
+            # the game advances in fixed ticks, however long the last frame took
+            for _ in range(clock.steps()):
+                self.step()
+                if self.exit:
+                    break
+            if self.exit:
+                break
+            # nothing going on: let the firmware slow the frame rate down, and
+            # keep the world and print the trace, in case the app is closed
+            # from here
+            if clock.idle == self.request_fast_updates:
+                self.request_fast_updates = not clock.idle
+                if clock.idle:
+                    self.save_snapshot()
+                    tracer.dump()
+            if clock.skip_render():
+                # behind: spend this frame on ticks, but let other tasks run
+                if profiler is not None:
+                    profiler.end_frame()
+                await asyncio.sleep(0)
+                continue
+
+            # update camera to center player and move world, then push the
+            # frame's OAM changes to the hardware in one go
+            self.world.update()
+            if profiler is not None:
+                profiler.mark(PHASE_WORLD)
+            self.shadow.flush()
+            if profiler is not None:
+                profiler.mark(PHASE_OAM)
             await render_update()
-            # await asyncio.sleep(1)
+            if profiler is not None:
+                profiler.mark(PHASE_RENDER)
+                profiler.end_frame()
+                # outside the timed frame, so the overlay does not skew it
+                if self.hud is not None:
+                    self.hud.update()
 
     def special_action(self):
         """Perform a special action"""
         # add a poop
-        spr = self.init_sprite(
-            oam=len(self.all_sprites),
-            x=-200,
-            y=-200,
-            width=SPRITE_WIDTH,
-            height=SPRITE_HEIGHT,
-            graphics_x=0,
-            graphics_y=SPRITE_HEIGHT * 1,
-        )
-        self.poos.append(spr)
         assert self.world.player is not None, "Player must be set in the world"
         self.world.register_object_at_tile(
             tile_x=self.world.player.x // self.world.tile_size,
             tile_y=self.world.player.y // self.world.tile_size,
-            sprite=spr,
+            kind=KIND_POO,
         )
 
     def draw(self):
-        cur_time = time.ticks_ms()
-        # update camera to center player and move world
-        self.world.update()
-
-        # self.ms.flags = sasppu.MainState.CMATH_ENABLE
-        # ms.window_1_left = int((math.sin(cur_time / 1300.0) + 1) * 64)
-        # ms.window_1_right = int((math.cos(cur_time / 1500.0) + 3) * 64)
-        # self.cs.flags = sasppu.CMathState.FADE_ENABLE
-        # self.cs.fade = int((math.sin(cur_time / 1000.0) + 1) * 127)
-        # print("fps:", display.get_fps())
+        # fades and window animation are precomputed HDMA tables, see effects.py
+        pass
 
     def minimise(self):
         # Close this app each time
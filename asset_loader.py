@@ -0,0 +1,181 @@
+import struct
+
+import sasppu
+
+from .constants import ASSET_BUFFER_BYTES
+
+# asset header, written by encode_image.py --header (keep the two in sync):
+# magic, width, height, encoding, bits per pixel, palette entries, rows per
+# compressed band; followed by the palette (BGR555, little-endian) and the data
+ASSET_MAGIC = b"SPPU"
+HEADER_FORMAT = "<4sHHBBHH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+ENCODING_RAW = 0
+ENCODING_PALETTED = 1
+ENCODING_COMPRESSED = 2
+
+TARGET_SPRITE = 0
+TARGET_BACKGROUND = 1
+
+MAX_PALETTE_BYTES = 256 * 2
+
+
+def _bitdepth(bpp: int) -> int:
+    if bpp == 1:
+        return sasppu.BPP1
+    if bpp == 2:
+        return sasppu.BPP2
+    if bpp == 4:
+        return sasppu.BPP4
+    if bpp == 8:
+        return sasppu.BPP8
+    raise ValueError(f"Unsupported bit depth {bpp}")
+
+
+class AssetLoader:
+    """
+    Streams image assets from flash into graphics memory in row bands.
+
+    Data is read with readinto() into one buffer allocated up front, and each
+    band is blitted at its y offset before the next one is read, so peak RAM
+    while loading is the buffer size however big the sheet is.
+
+    Files starting with the asset header may be raw, paletted or compressed.
+    Files without one (like hedhog.bin) are raw BGR555 and need their size
+    passed in.
+    """
+
+    # description of the asset being streamed, valid inside band callbacks
+    width: int
+    height: int
+    encoding: int
+    bpp: int
+    palette: memoryview
+
+    def __init__(self, budget: int = ASSET_BUFFER_BYTES):
+        self.buffer = bytearray(budget)
+        self.view = memoryview(self.buffer)
+        self._header = bytearray(HEADER_SIZE)
+        self._palette = bytearray(MAX_PALETTE_BYTES)
+        self._length = bytearray(2)
+        self.width = 0
+        self.height = 0
+        self.encoding = ENCODING_RAW
+        self.bpp = 16
+        self.palette = memoryview(self._palette)[:0]
+        self._band_rows = 0
+
+    def _read_header(self, f, width: int, height: int) -> None:
+        """Parse the header, or rewind and fall back to headerless raw data."""
+        n = f.readinto(self._header)
+        if n == HEADER_SIZE and self._header[:4] == ASSET_MAGIC:
+            (
+                _,
+                self.width,
+                self.height,
+                self.encoding,
+                self.bpp,
+                palette_entries,
+                self._band_rows,
+            ) = struct.unpack(HEADER_FORMAT, self._header)
+            palette_bytes = palette_entries * 2
+            if palette_bytes > MAX_PALETTE_BYTES:
+                raise ValueError("Palette too large")
+            if self.encoding == ENCODING_COMPRESSED and not self._band_rows:
+                raise ValueError("Compressed asset without band rows")
+            self.palette = memoryview(self._palette)[:palette_bytes]
+            if f.readinto(self.palette) != palette_bytes:
+                raise ValueError("Asset palette is truncated")
+            return
+        if not width or not height:
+            raise ValueError("Headerless asset needs width and height")
+        f.seek(0)
+        self.width = width
+        self.height = height
+        self.encoding = ENCODING_RAW
+        self.bpp = 16
+        self.palette = memoryview(self._palette)[:0]
+        self._band_rows = 0
+
+    def stream(self, path: str, on_band, width: int = 0, height: int = 0) -> None:
+        """Read an asset band by band, calling on_band(row, rows, data) for each.
+        `data` is a view into the shared buffer, only valid during the call."""
+        for row, rows, data in self.bands(path, width, height):
+            on_band(row, rows, data)
+
+    def bands(self, path: str, width: int = 0, height: int = 0):
+        """Iterate over an asset's bands as (row, rows, data), reading each one
+        only when it is asked for, so loading can be spread over frames.
+        `data` is a view into the shared buffer, only valid until the next band."""
+        with open(path, "rb") as f:
+            self._read_header(f, width, height)
+            if self.encoding == ENCODING_COMPRESSED:
+                yield from self._compressed_bands(f, path)
+                return
+            row_bytes = (self.width * self.bpp + 7) // 8
+            band_rows = len(self.buffer) // row_bytes
+            if not band_rows:
+                raise ValueError("Asset row does not fit in the load buffer")
+            row = 0
+            while row < self.height:
+                rows = min(band_rows, self.height - row)
+                data = self.view[: rows * row_bytes]
+                if f.readinto(data) != len(data):
+                    raise ValueError(f"Asset {path} is truncated")
+                yield row, rows, data
+                row += rows
+
+    def _compressed_bands(self, f, path: str):
+        # compressed data is stored as independently compressed bands of
+        # _band_rows rows, each prefixed with its u16 byte length
+        row = 0
+        while row < self.height:
+            rows = min(self._band_rows, self.height - row)
+            if f.readinto(self._length) != 2:
+                raise ValueError(f"Asset {path} is truncated")
+            n = self._length[0] | (self._length[1] << 8)
+            if n > len(self.buffer):
+                raise ValueError("Compressed band does not fit in the load buffer")
+            data = self.view[:n]
+            if f.readinto(data) != n:
+                raise ValueError(f"Asset {path} is truncated")
+            yield row, rows, data
+            row += rows
+
+    def blit(
+        self,
+        path: str,
+        x: int,
+        y: int,
+        target: int = TARGET_SPRITE,
+        width: int = 0,
+        height: int = 0,
+        double_size: bool = False,
+    ) -> None:
+        """Load an asset into sprite or background graphics memory at (x, y)."""
+
+        def on_band(row: int, rows: int, data: memoryview) -> None:
+            w = self.width
+            if self.encoding == ENCODING_RAW:
+                if target == TARGET_SPRITE:
+                    sasppu.blit_sprite(x, y + row, w, rows, data, double_size)
+                else:
+                    sasppu.blit_background(x, y + row, w, rows, data, double_size)
+                return
+            bitdepth = _bitdepth(self.bpp)
+            if self.encoding == ENCODING_PALETTED:
+                blit = (
+                    sasppu.paletted_sprite
+                    if target == TARGET_SPRITE
+                    else sasppu.paletted_background
+                )
+            else:
+                blit = (
+                    sasppu.compressed_sprite
+                    if target == TARGET_SPRITE
+                    else sasppu.compressed_background
+                )
+            blit(x, y + row, w, rows, self.palette, bitdepth, data, double_size)
+
+        self.stream(path, on_band, width, height)
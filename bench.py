@@ -0,0 +1,314 @@
+"""
+Scaling benchmarks for World placement and the per-frame camera update.
+
+Sweeps world sizes and object counts and measures, per call, time, memory
+allocated and peak memory of World.__init__, register_object_random,
+register_object_at_tile and World.update. Flushes go to plain stand-in sprite
+objects rather than sasppu.oam, so the numbers are the World's own cost.
+
+Time is the median of several samples, and the spread of those samples is kept
+as the case's noise floor: a time change smaller than that cannot be told apart
+from timer and scheduler noise. Memory numbers are exact, so they are what a
+regression check can rely on; times are only comparable on an otherwise idle
+machine.
+
+Runs on CPython (through host/bench.py, which also handles the JSON baselines
+and regression threshold) and on MicroPython, where it can be run from the
+REPL on the badge:
+
+    from apps.saspputest import bench
+    bench.report(bench.run_suite(sizes=(8, 32, 128), counts=(16, 256)))
+
+Memory is measured with tracemalloc where available (bytes still allocated
+after the call, and peak during it) and with gc.mem_alloc() otherwise (bytes
+allocated with the collector disabled, so both numbers are the same).
+"""
+
+import gc
+import random
+import time
+
+import sasppu
+
+from .world import World
+from .player import Player
+from .shadow_oam import ShadowOAM
+from .oam_pool import OAMPool
+from .kinds import KIND_POO
+from .constants import SCREEN_WIDTH, SCREEN_HEIGHT, SPRITE_WIDTH, SPRITE_HEIGHT
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+
+    def ticks_us() -> int:
+        # CPU time of this process, so other load on the host does not count
+        return time.process_time_ns() // 1000
+
+    def ticks_diff(a: int, b: int) -> int:
+        return a - b
+
+
+DEFAULT_SIZES = (8, 32, 128, 512, 1024)
+DEFAULT_COUNTS = (16, 256, 4096)
+UPDATE_FRAMES = 120
+# each timing sample keeps rerunning a benchmark for at least this long
+MIN_TIME_US = 20000
+SEED = 1234
+
+
+class StandInSprite:
+    """Plain object with the fields of sasppu.Sprite, as a flush target."""
+
+    __slots__ = (
+        "x",
+        "y",
+        "width",
+        "height",
+        "graphics_x",
+        "graphics_y",
+        "windows",
+        "window_1",
+        "window_2",
+        "flags",
+    )
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+        self.graphics_x = 0
+        self.graphics_y = 0
+        self.windows = 0
+        self.window_1 = 0
+        self.window_2 = 0
+        self.flags = 0
+
+
+def _new_oam() -> tuple[ShadowOAM, OAMPool]:
+    oam = ShadowOAM(
+        sasppu.SPRITE_COUNT,
+        target=[StandInSprite() for _ in range(sasppu.SPRITE_COUNT)],
+    )
+    return oam, OAMPool(oam.count)
+
+
+def _world(size: int, oam: ShadowOAM, pool: OAMPool) -> World:
+    return World(
+        tile_size=SPRITE_WIDTH,
+        world_size_tiles=(size, size),
+        screen_width=SCREEN_WIDTH,
+        screen_height=SCREEN_HEIGHT,
+        oam=oam,
+        pool=pool,
+    )
+
+
+def _new_world(size: int) -> World:
+    oam, pool = _new_oam()
+    world = _world(size, oam, pool)
+    slot = pool.acquire()
+    oam.init(slot, 0, 0, SPRITE_WIDTH, SPRITE_HEIGHT, 0, 0, sasppu.WINDOW_ALL, 0)
+    world.set_player(Player(oam, slot, 0))
+    return world
+
+
+# each benchmark: setup(size, count) -> state, and run(state) -> calls made
+
+
+def _setup_init(size: int, count: int):
+    # only World.__init__ is measured; the OAM it is given is built here, and
+    # the world is kept in the state so it still counts as allocated after
+    oam, pool = _new_oam()
+    return [size, oam, pool, None]
+
+
+def _run_init(state) -> int:
+    state[3] = _world(state[0], state[1], state[2])
+    return 1
+
+
+def _setup_random(size: int, count: int):
+    random.seed(SEED)
+    return _new_world(size), count
+
+
+def _run_random(state) -> int:
+    world, count = state
+    for _ in range(count):
+        world.register_object_random(KIND_POO)
+    return count
+
+
+def _setup_at_tile(size: int, count: int):
+    world, count = _setup_random(size, count)
+    # spread over the world with a stride coprime to its area
+    tiles = size * size
+    placements = [(i * 7919) % tiles for i in range(count)]
+    return world, placements
+
+
+def _run_at_tile(state) -> int:
+    world, placements = state
+    width = world.world_size_tiles[0]
+    for i in placements:
+        world.register_object_at_tile(i % width, i // width, KIND_POO)
+    return len(placements)
+
+
+def _setup_update(size: int, count: int):
+    world, count = _setup_random(size, count)
+    _run_random((world, count))
+    world.update()
+    world.oam.flush()
+    return world
+
+
+def _run_update(world) -> int:
+    player = world.player
+    flush = world.oam.flush
+    for _ in range(UPDATE_FRAMES):
+        player.x += 2
+        player.y += 1
+        world.update()
+        flush()
+    return UPDATE_FRAMES
+
+
+BENCHMARKS = (
+    ("world_init", _setup_init, _run_init),
+    ("register_object_random", _setup_random, _run_random),
+    ("register_object_at_tile", _setup_at_tile, _run_at_tile),
+    ("world_update", _setup_update, _run_update),
+)
+
+
+def _time_us(setup, run, size: int, count: int) -> float:
+    """Mean time per call, over as many fresh runs as fit in MIN_TIME_US."""
+    elapsed = 0
+    calls = 0
+    while elapsed < MIN_TIME_US:
+        state = setup(size, count)
+        gc.collect()
+        start = ticks_us()
+        calls += run(state)
+        elapsed += ticks_diff(ticks_us(), start)
+    return elapsed / calls
+
+
+def _median(samples: list) -> float:
+    samples = sorted(samples)
+    mid = len(samples) // 2
+    if len(samples) % 2:
+        return samples[mid]
+    return (samples[mid - 1] + samples[mid]) / 2
+
+
+def _memory(setup, run, size: int, count: int) -> tuple[int, int]:
+    """(bytes allocated, peak bytes) per call."""
+    state = setup(size, count)
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        calls = run(state)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return (current - before) // calls, (peak - before) // calls
+    gc.disable()
+    before = gc.mem_alloc()
+    calls = run(state)
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    return allocated // calls, allocated // calls
+
+
+def case_key(name: str, size: int, count: int) -> str:
+    return f"{name}/{size}x{size}/{count}"
+
+
+def run_suite(
+    sizes=DEFAULT_SIZES, counts=DEFAULT_COUNTS, repeat: int = 5, log=print
+) -> dict:
+    """Run every benchmark for every size and object count that fits, returning
+    {case key: {"time_us", "noise_us", "alloc", "peak"}}; time is the median of
+    `repeat` samples and noise the difference between the slowest and fastest."""
+    results = {}
+    for size in sizes:
+        for count in counts:
+            # leave room to place every object, and only one count for init
+            if count > size * size // 2:
+                continue
+            for name, setup, run in BENCHMARKS:
+                if name == "world_init" and count != counts[0]:
+                    continue
+                samples = [_time_us(setup, run, size, count) for _ in range(repeat)]
+                time_us = _median(samples)
+                noise_us = max(samples) - min(samples)
+                alloc, peak = _memory(setup, run, size, count)
+                key = case_key(name, size, count)
+                results[key] = {
+                    "time_us": round(time_us, 2),
+                    "noise_us": round(noise_us, 2),
+                    "alloc": alloc,
+                    "peak": peak,
+                }
+                if log is not None:
+                    log(
+                        f"{key}: {time_us:.1f}us (+-{noise_us:.1f}) "
+                        f"alloc={alloc} peak={peak}"
+                    )
+    return results
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    threshold: float = 0.25,
+    slack_us: float = 0.5,
+    slack_bytes: int = 256,
+    gate_time: bool = False,
+) -> tuple[list, list]:
+    """Compare results against a baseline, returning (regressions, notes).
+
+    A case regresses when its memory grows by more than `threshold` and by
+    more than slack_bytes (allocator rounding). Time growth by more than
+    `threshold` is listed in `notes`, marked as within noise if it is no more
+    than the noise floor (the larger of slack_us and the noise measured for
+    the case in either run); with gate_time, growth past the floor counts as
+    a regression instead. Cases missing from either side are ignored."""
+    regressions = []
+    notes = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        limit = old["time_us"] * (1 + threshold)
+        if new["time_us"] > limit:
+            floor = max(slack_us, old.get("noise_us", 0), new.get("noise_us", 0))
+            line = f"{key}: time {old['time_us']}us -> {new['time_us']}us"
+            if new["time_us"] <= limit + floor:
+                notes.append(f"{line} (within noise, {floor:.1f}us)")
+            elif gate_time:
+                regressions.append(line)
+            else:
+                notes.append(f"{line} (slower, not gated)")
+        for field in ("alloc", "peak"):
+            if new[field] > old[field] * (1 + threshold) + slack_bytes:
+                regressions.append(f"{key}: {field} {old[field]} -> {new[field]}")
+    return regressions, notes
+
+
+def report(results: dict) -> None:
+    for key in sorted(results):
+        r = results[key]
+        print(
+            f"{key:40} {r['time_us']:12.1f}us +-{r.get('noise_us', 0):<8.1f}"
+            f" {r['alloc']:10} {r['peak']:10}"
+        )
@@ -0,0 +1,200 @@
+from array import array
+
+import sasppu
+
+from .kinds import KIND_NONE, KIND_TREE, KIND_CAVE, KIND_POO
+from .grid import OccupancyGrid
+from .packing import pack_key
+
+# generation odds per tile, out of 64 (roughly the density of the old 8x8 world)
+TREE_ODDS = 20
+CAVE_ODDS = 5
+POO_ODDS = 10
+
+
+class XorShift32:
+    """Small deterministic RNG, independent of the global `random` state."""
+
+    state: int
+
+    def __init__(self, seed: int):
+        self.state = (seed & 0xFFFFFFFF) or 0x9E3779B9
+
+    def next(self) -> int:
+        x = self.state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self.state = x
+        return x
+
+    def below(self, n: int) -> int:
+        """Random int in [0, n)."""
+        return self.next() % n
+
+
+def chunk_seed(seed: int, chunk_x: int, chunk_y: int) -> int:
+    """Mix the world seed and a chunk coordinate into the chunk's RNG seed."""
+    h = (seed ^ ((chunk_x & 0xFFFF) * 0x85EBCA6B)) & 0xFFFFFFFF
+    h = (h ^ ((chunk_y & 0xFFFF) * 0xC2B2AE35)) & 0xFFFFFFFF
+    h ^= h >> 16
+    return (h * 0x45D9F3B) & 0xFFFFFFFF
+
+
+class Chunk:
+    """One loaded chunk: the occupancy grid of its tiles."""
+
+    chunk_x: int
+    chunk_y: int
+    grid: OccupancyGrid
+    # update it was last needed in, for LRU eviction
+    stamp: int
+
+    def __init__(self, chunk_x: int, chunk_y: int, chunk_tiles: int):
+        self.chunk_x = chunk_x
+        self.chunk_y = chunk_y
+        self.grid = OccupancyGrid(
+            chunk_tiles, chunk_tiles, chunk_x * chunk_tiles, chunk_y * chunk_tiles
+        )
+        self.stamp = 0
+
+
+class ChunkManager:
+    """
+    Lazily generated world, in square chunks of chunk_tiles x chunk_tiles tiles.
+
+    Chunks within view_distance chunks of the player are generated from the
+    world seed when needed; each chunk has its own deterministic RNG so it comes
+    out the same every time. Loaded chunks live in a size-bounded LRU cache, and
+    changes made by the player are kept in a compact per-chunk diff that is
+    applied on top of the generated content, so memory depends on the view
+    distance rather than on the size of the world.
+    """
+
+    seed: int
+    chunk_tiles: int
+    view_distance: int
+    capacity: int
+    loaded: dict[int, Chunk]
+    # chunk key -> edits, each (local tile index << 4) | kind; KIND_NONE removes
+    diffs: dict[int, array]
+
+    def __init__(
+        self,
+        world,
+        seed: int,
+        chunk_tiles: int = 8,
+        view_distance: int = 1,
+        capacity: int = 0,
+    ):
+        # edits pack the local tile index into 12 bits
+        assert chunk_tiles * chunk_tiles <= 4096, "chunk_tiles too large"
+        self.world = world
+        self.seed = seed
+        self.chunk_tiles = chunk_tiles
+        self.view_distance = view_distance
+        side = 2 * view_distance + 1
+        # everything in view, plus one ring of slack so walking back and forth
+        # along a chunk border does not regenerate chunks
+        self.capacity = capacity or (side + 2) * (side + 2)
+        self.loaded = {}
+        self.diffs = {}
+        self._stamp = 0
+        # chunk the player was in last update, to skip work while inside it
+        self._center = -1
+
+    def update(self, tile_x: int, tile_y: int) -> None:
+        """Make sure the chunks around a tile are loaded."""
+        n = self.chunk_tiles
+        center_x = tile_x // n
+        center_y = tile_y // n
+        center = pack_key(center_x, center_y)
+        if center == self._center:
+            return
+        self._center = center
+        self._stamp += 1
+        stamp = self._stamp
+        r = self.view_distance
+        for cy in range(center_y - r, center_y + r + 1):
+            for cx in range(center_x - r, center_x + r + 1):
+                chunk = self.loaded.get(pack_key(cx, cy))
+                if chunk is None:
+                    chunk = self._load(cx, cy)
+                chunk.stamp = stamp
+        while len(self.loaded) > self.capacity:
+            self._evict()
+
+    def _load(self, chunk_x: int, chunk_y: int) -> Chunk:
+        """Generate a chunk and apply the player's edits to it."""
+        key = pack_key(chunk_x, chunk_y)
+        n = self.chunk_tiles
+        chunk = Chunk(chunk_x, chunk_y, n)
+        self.loaded[key] = chunk
+        base_x = chunk_x * n
+        base_y = chunk_y * n
+        kinds = bytearray(n * n)
+        flips = bytearray(n * n)
+        rng = XorShift32(chunk_seed(self.seed, chunk_x, chunk_y))
+        for i in range(n * n):
+            roll = rng.next()
+            odds = roll & 63
+            if odds < TREE_ODDS:
+                kinds[i] = KIND_TREE
+            elif odds < TREE_ODDS + CAVE_ODDS:
+                kinds[i] = KIND_CAVE
+                flips[i] = (roll >> 6) & 1
+            elif odds < TREE_ODDS + CAVE_ODDS + POO_ODDS:
+                kinds[i] = KIND_POO
+        diff = self.diffs.get(key)
+        if diff is not None:
+            for edit in diff:
+                kinds[edit >> 4] = edit & 0xF
+                flips[edit >> 4] = 0
+        for i in range(n * n):
+            kind = kinds[i]
+            if kind == KIND_NONE:
+                continue
+            self.world._place(
+                base_x + i % n, base_y + i // n, kind, sasppu.FLIP_X if flips[i] else 0
+            )
+        return chunk
+
+    def _evict(self) -> None:
+        """Unload the least recently needed chunk."""
+        oldest_key = -1
+        oldest = None
+        for key, chunk in self.loaded.items():
+            if oldest is None or chunk.stamp < oldest.stamp:
+                oldest_key = key
+                oldest = chunk
+        assert oldest is not None
+        cells = oldest.grid.cells
+        for i in range(len(cells)):
+            if cells[i]:
+                self.world._unplace(cells[i])
+        del self.loaded[oldest_key]
+
+    def record(self, tile_x: int, tile_y: int, kind: int) -> None:
+        """Remember that the player put an object of `kind` (or KIND_NONE, to
+        remove one) on a tile, so it survives the chunk being evicted."""
+        n = self.chunk_tiles
+        chunk_x = tile_x // n
+        chunk_y = tile_y // n
+        key = pack_key(chunk_x, chunk_y)
+        index = (tile_y - chunk_y * n) * n + (tile_x - chunk_x * n)
+        diff = self.diffs.get(key)
+        if diff is None:
+            diff = self.diffs[key] = array("H")
+        # a later edit of the same tile replaces the earlier one
+        for i in range(len(diff)):
+            if diff[i] >> 4 == index:
+                diff[i] = (index << 4) | kind
+                break
+        else:
+            diff.append((index << 4) | kind)
+
+    def grid_for(self, tile_x: int, tile_y: int) -> OccupancyGrid | None:
+        """Occupancy grid of the chunk holding a tile, or None if it is not loaded."""
+        n = self.chunk_tiles
+        chunk = self.loaded.get(pack_key(tile_x // n, tile_y // n))
+        return chunk.grid if chunk is not None else None
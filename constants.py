@@ -1,6 +1,63 @@
 SCREEN_WIDTH, SCREEN_HEIGHT = 240, 240
 SPRITE_WIDTH, SPRITE_HEIGHT = 64, 64
+# background graphics memory and the 8x8 tiles the bg maps index into
+BG_GRAPHICS_WIDTH = 256
+BG_TILE_SIZE = 8
+
+# draw static scenery (trees, caves) into the bg0 tilemap instead of using sprites
+SCENERY_IN_TILEMAP = True
+
+# generate the world lazily in chunks around the player instead of one 8x8 map;
+# None keeps the fixed world, otherwise this is the world seed
+CHUNKED_WORLD_SEED: int | None = None
+CHUNK_TILES = 8
+VIEW_DISTANCE_CHUNKS = 1
+
+# frames of per-phase timings to keep (0 disables the profiler), whether to show
+# them on screen, and where in sprite graphics memory (below the sheet) the
+# overlay text is drawn
+PROFILE_FRAMES = 0
+PROFILE_HUD = False
+HUD_GRAPHICS_X = 0
+HUD_GRAPHICS_Y = SPRITE_HEIGHT * 2
+
+# ticks of the opening transition (fade in, window wipe and background wobble,
+# with input ignored until it ends); 0 starts straight away
+INTRO_FRAMES = 48
+
+# the game simulates in fixed ticks of SIM_TICK_US (60 per second), catching up
+# at most SIM_MAX_STEPS ticks per frame and skipping at most
+# SIM_MAX_SKIPPED_RENDERS renders in a row to do so; SIM_LOCKSTEP makes every
+# frame one tick instead (headless runs). After IDLE_TICKS ticks without input
+# or animation the app stops asking for fast updates
+SIM_TICK_US = 16667
+SIM_MAX_STEPS = 4
+SIM_MAX_SKIPPED_RENDERS = 1
+SIM_LOCKSTEP = False
+IDLE_TICKS = 120
+
+# startup: everything not needed for the first (black) frame is done in slices
+# of at most STARTUP_SLICE_US per frame after it, and a time to first frame over
+# FIRST_FRAME_BUDGET_US (from the app being constructed) is traced as a warning
+STARTUP_SLICE_US = 8000
+FIRST_FRAME_BUDGET_US = 50000
+
+# diagnostics kept in the trace ring buffer (see trace.py) and printed outside
+# the frame loop: 0 none, 1 warnings, 2 startup info, 3 per-frame debug events
+TRACE_LEVEL = 1
+TRACE_CAPACITY = 64
 
 ASSET_PATH = "./apps/saspputest/"
+# load buffer for streaming assets in; caps peak RAM while loading
+ASSET_BUFFER_BYTES = 8192
 SPRITE_FILENAME = "hedhog.bin"
 # SPRITE_FILENAME = "hedhog-nopoop.bin"
+
+# "record" logs every frame's buttons and the RNG seed to REPLAY_PATH, "replay"
+# plays such a log back instead of reading the buttons; None does neither
+REPLAY_MODE: str | None = None
+REPLAY_PATH = ASSET_PATH + "session.rpl"
+
+# where the world and player are saved when the app goes idle, and restored from
+# at startup; None always starts a new world
+SNAPSHOT_PATH: str | None = ASSET_PATH + "world.snap"
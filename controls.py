@@ -0,0 +1,110 @@
+from events.input import BUTTON_TYPES, ButtonDownEvent, ButtonUpEvent
+from system.eventbus import eventbus
+
+from .direction import Direction, DirectionTuple, FACING_COUNT
+
+# one bit per button in Controls.mask
+BUTTON_UP = 0x01
+BUTTON_DOWN = 0x02
+BUTTON_LEFT = 0x04
+BUTTON_RIGHT = 0x08
+BUTTON_CANCEL = 0x10
+BUTTON_CONFIRM = 0x20
+BUTTON_COUNT = 6
+
+BUTTON_BITS = (
+    ("UP", BUTTON_UP),
+    ("DOWN", BUTTON_DOWN),
+    ("LEFT", BUTTON_LEFT),
+    ("RIGHT", BUTTON_RIGHT),
+    ("CANCEL", BUTTON_CANCEL),
+    ("CONFIRM", BUTTON_CONFIRM),
+)
+
+# what a button combination does besides moving
+ACTION_NONE = 0
+ACTION_SPECIAL = 1
+
+# INPUT_TABLE entries: action above the direction index
+ACTION_SHIFT = 4
+DIRECTION_MASK = 0x0F
+
+# direction for each DirectionTuple.index; the middle entry is standing still
+DIRECTIONS: tuple[Direction, ...] = tuple(
+    (i % 3 - 1, i // 3 - 1) for i in range(FACING_COUNT)
+)
+STILL = DirectionTuple.index((0, 0))
+
+# the buttons sit around the badge, so a direction is pressed with the pair of
+# buttons either side of it; a single button moves diagonally
+CARDINALS = (
+    (DirectionTuple.N, BUTTON_CANCEL | BUTTON_RIGHT),
+    (DirectionTuple.S, BUTTON_LEFT | BUTTON_CONFIRM),
+    (DirectionTuple.E, BUTTON_RIGHT | BUTTON_CONFIRM),
+    (DirectionTuple.W, BUTTON_CANCEL | BUTTON_LEFT),
+)
+DIAGONALS = (
+    (DirectionTuple.NW, BUTTON_CANCEL),
+    (DirectionTuple.NE, BUTTON_RIGHT),
+    (DirectionTuple.SW, BUTTON_LEFT),
+    (DirectionTuple.SE, BUTTON_CONFIRM),
+)
+
+
+def _resolve(mask: int) -> int:
+    """INPUT_TABLE entry for one button combination."""
+    pressed = [d for d, buttons in CARDINALS if mask & buttons == buttons]
+    if not pressed:
+        # only diagonal movement if no cardinal direction is pressed
+        pressed = [d for d, button in DIAGONALS if mask & button]
+    # every pressed direction is a step; opposite ones cancel out
+    dx = sum(d[0] for d in pressed)
+    dy = sum(d[1] for d in pressed)
+    direction = DirectionTuple.index((dx, dy))
+    action = ACTION_NONE
+    if not mask & BUTTON_UP and mask & BUTTON_DOWN:
+        action = ACTION_SPECIAL
+    return (action << ACTION_SHIFT) | direction
+
+
+# built once at import: button mask -> movement direction and action
+INPUT_TABLE = bytes(_resolve(mask) for mask in range(1 << BUTTON_COUNT))
+
+
+class Controls:
+    """
+    Button state as one integer bitmask, kept up to date from button events.
+
+    Decoding a frame's input is then a single INPUT_TABLE lookup:
+
+        entry = INPUT_TABLE[controls.mask]
+        direction = entry & DIRECTION_MASK  # STILL if not moving
+        action = entry >> ACTION_SHIFT
+    """
+
+    mask: int
+
+    def __init__(self, app):
+        self.app = app
+        self.mask = 0
+        self._buttons = tuple((BUTTON_TYPES[name], bit) for name, bit in BUTTON_BITS)
+        eventbus.on(ButtonDownEvent, self._handle_buttondown, app)
+        eventbus.on(ButtonUpEvent, self._handle_buttonup, app)
+
+    def _bits(self, event) -> int:
+        bits = 0
+        for button, bit in self._buttons:
+            if button in event.button:
+                bits |= bit
+        return bits
+
+    def _handle_buttondown(self, event: ButtonDownEvent):
+        self.mask |= self._bits(event)
+
+    def _handle_buttonup(self, event: ButtonUpEvent):
+        self.mask &= ~self._bits(event)
+
+    def remove(self) -> None:
+        """Stop listening for button events."""
+        eventbus.remove(ButtonDownEvent, self._handle_buttondown, self.app)
+        eventbus.remove(ButtonUpEvent, self._handle_buttonup, self.app)
@@ -1,17 +1,279 @@
+#!/usr/bin/env python3
+"""
+Asset inspector: decodes the files encode_image.py writes back into images.
+
+    python decode.py input.bin output.png [--width N] [--bpp N] [--compressed]
+    python decode.py --diff a.bin b.bin [--png diff.png] [--width N]
+    python decode.py --check image.png [--bpp N] [--compress] [--header]
+
+Files are memory-mapped and decoded with NumPy in one pass, so even a large
+sheet costs a few array operations rather than a Python object per pixel.
+
+Headered assets (encode_image.py --header) describe themselves. Headerless
+files are raw BGR555 by default (like hedhog.bin), as wide as --width; with
+--bpp they are packed palette indices (--compressed: run-length encoded) with
+the palette in the .pal file next to them, as encode_image.py writes them.
+
+--diff compares two assets pixel by pixel and can write a PNG of the first
+with the differing pixels highlighted. --check encodes an image with
+encode_image.py's options and decodes it again, reporting any pixel that does
+not come back as the encoder meant it to (after palette quantization).
+"""
+
+import argparse
+import os
 import struct
+import sys
+
+import numpy as np
+from PIL import Image
+
+from encode_image import (
+    ASSET_MAGIC,
+    HEADER_FORMAT,
+    ENCODING_RAW,
+    ENCODING_PALETTED,
+    ENCODING_COMPRESSED,
+    image_to_bgr555,
+    quantize,
+    pack_indices,
+    compress_indices,
+    encode_asset,
+)
+
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# width of the app's sprite sheets (SPRITE_WIDTH * 4)
+DEFAULT_WIDTH = 256
+# colour of differing pixels in --diff previews
+DIFF_COLOUR = (255, 0, 255)
+
+
+def map_asset(path: str) -> np.ndarray:
+    """The bytes of a file, memory-mapped read-only (nothing is read until used)."""
+    if not os.path.getsize(path):
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def bgr555_to_rgb888(pixels: np.ndarray) -> np.ndarray:
+    """Convert BGR555 pixels to RGB888, as an array with a trailing axis of 3.
+    Each 5-bit channel is widened by repeating its top bits, so 31 becomes 255."""
+    pixels = pixels.astype(np.uint16, copy=False)
+    channels = np.stack(((pixels >> 10) & 31, (pixels >> 5) & 31, pixels & 31), -1)
+    return ((channels << 3) | (channels >> 2)).astype(np.uint8)
+
+
+def unpack_indices(data: np.ndarray, width: int, height: int, bpp: int) -> np.ndarray:
+    """Inverse of encode_image.pack_indices: (height, width) palette indices."""
+    if bpp == 8:
+        return data[: width * height].reshape(height, width)
+    per_byte = 8 // bpp
+    row_bytes = -(-width // per_byte)
+    rows = data[: row_bytes * height].reshape(height, row_bytes, 1)
+    shifts = (np.arange(per_byte, dtype=np.uint8) * bpp).astype(np.uint8)
+    indices = (rows >> shifts) & ((1 << bpp) - 1)
+    return indices.reshape(height, row_bytes * per_byte)[:, :width]
+
+
+def decompress_indices(data: np.ndarray) -> np.ndarray:
+    """Inverse of encode_image.compress_indices: the flat run of indices."""
+    lengths = data[0::2].astype(np.int64) + 1
+    return np.repeat(data[1::2], lengths)
+
+
+def _bgr555(data: np.ndarray) -> np.ndarray:
+    """Little-endian 16-bit values from bytes (a view where possible)."""
+    return data[: len(data) // 2 * 2].view("<u2")
+
+
+def _join_bands(data: np.ndarray, height: int, band_rows: int) -> np.ndarray:
+    """The compressed bands of a headered asset, without their length prefixes."""
+    pieces = []
+    offset = 0
+    for _ in range(-(-height // band_rows)):
+        (length,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        pieces.append(data[offset : offset + length])
+        offset += length
+    return np.concatenate(pieces) if pieces else data[:0]
+
+
+def decode_asset(
+    data: np.ndarray,
+    width: int = DEFAULT_WIDTH,
+    bpp: int = 0,
+    palette: np.ndarray | None = None,
+    compressed: bool = False,
+) -> np.ndarray:
+    """Decode asset bytes to a (height, width) array of BGR555 pixels.
+
+    Headered assets ignore the other arguments. Headerless ones are raw
+    BGR555 unless bpp is given, in which case the palette is needed too."""
+    if data[:4].tobytes() == ASSET_MAGIC:
+        magic, width, height, encoding, bpp, colours, band_rows = struct.unpack_from(
+            HEADER_FORMAT, data
+        )
+        body = data[HEADER_SIZE:]
+        if encoding == ENCODING_RAW:
+            return _bgr555(body)[: width * height].reshape(height, width)
+        palette = _bgr555(body[: 2 * colours])
+        body = body[2 * colours :]
+        if encoding == ENCODING_PALETTED:
+            return palette[unpack_indices(body, width, height, bpp)]
+        if encoding == ENCODING_COMPRESSED:
+            indices = decompress_indices(_join_bands(body, height, band_rows))
+            return palette[indices[: width * height].reshape(height, width)]
+        raise ValueError(f"Unknown encoding {encoding}")
+    if not bpp:
+        pixels = _bgr555(data)
+        return pixels[: len(pixels) // width * width].reshape(-1, width)
+    if palette is None:
+        raise ValueError("Paletted assets without a header need a palette")
+    if compressed:
+        indices = decompress_indices(data)
+        return palette[indices[: len(indices) // width * width].reshape(-1, width)]
+    per_byte = 8 // bpp
+    height = len(data) // -(-width // per_byte)
+    return palette[unpack_indices(data, width, height, bpp)]
+
+
+def load_asset(
+    path: str, width: int = DEFAULT_WIDTH, bpp: int = 0, compressed: bool = False
+) -> np.ndarray:
+    """Memory-map and decode an asset file; paletted headerless files take
+    their palette from the .pal file next to them."""
+    data = map_asset(path)
+    palette = None
+    if bpp and data[:4].tobytes() != ASSET_MAGIC:
+        palette = _bgr555(map_asset(os.path.splitext(path)[0] + ".pal"))
+    return decode_asset(data, width, bpp, palette, compressed)
+
+
+def save_png(pixels: np.ndarray, path: str) -> None:
+    """Write BGR555 pixels as an RGB PNG."""
+    Image.fromarray(bgr555_to_rgb888(pixels), "RGB").save(path)
+
+
+def diff_assets(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Mask of the pixels that differ between two decoded assets, over a's
+    shape; pixels outside b (if it is smaller) count as different."""
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    mask = np.ones(a.shape, dtype=bool)
+    mask[:height, :width] = a[:height, :width] != b[:height, :width]
+    return mask
+
+
+def diff_preview(pixels: np.ndarray, mask: np.ndarray) -> Image.Image:
+    """The first asset, dimmed, with the differing pixels in DIFF_COLOUR."""
+    rgb = bgr555_to_rgb888(pixels) // 3
+    rgb[mask] = DIFF_COLOUR
+    return Image.fromarray(rgb, "RGB")
+
+
+def check_round_trip(
+    image_path: str,
+    bpp: int = 0,
+    compress: bool = False,
+    header: bool = False,
+    band_rows: int = 0,
+) -> int:
+    """Encode an image as encode_image.py would with these options, decode it
+    again and return the number of pixels that did not survive. Paletted
+    encodings are compared against the quantized image, not the original."""
+    pixels = image_to_bgr555(Image.open(image_path))
+    height, width = pixels.shape
+    palette = None
+    if not bpp:
+        expected = pixels
+    else:
+        indices, palette = quantize(pixels, bpp)
+        expected = palette[indices]
+    if header:
+        data = encode_asset(pixels, bpp, compress, band_rows)
+    elif not bpp:
+        data = pixels.astype("<u2").tobytes()
+    elif compress:
+        data = compress_indices(indices)
+    else:
+        data = pack_indices(indices, bpp)
+    decoded = decode_asset(
+        np.frombuffer(data, dtype=np.uint8), width, bpp, palette, compress
+    )
+    if decoded.shape != expected.shape:
+        return expected.size
+    return int(np.count_nonzero(decoded != expected))
+
+
+def _bounds(mask: np.ndarray) -> str:
+    ys, xs = np.nonzero(mask)
+    return f"x {xs.min()}..{xs.max()}, y {ys.min()}..{ys.max()}"
 
-data = open("plane.bin", "rb").read()
-# unpack all pixels as little-endian uint16
-pixels = struct.unpack("<%dH" % (len(data) // 2), data)
 
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="asset (.bin), or image with --check")
+    parser.add_argument(
+        "output", nargs="?", help="output .png, or second asset with --diff"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--diff", action="store_true", help="compare two assets")
+    mode.add_argument(
+        "--check", action="store_true", help="round-trip an image through the encoder"
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=DEFAULT_WIDTH,
+        help=f"width of headerless assets (default {DEFAULT_WIDTH})",
+    )
+    parser.add_argument(
+        "--bpp",
+        type=int,
+        default=0,
+        choices=(0, 1, 2, 4, 8),
+        help="palette bit depth of headerless assets, or to --check with",
+    )
+    parser.add_argument(
+        "--compressed",
+        "--compress",
+        dest="compressed",
+        action="store_true",
+        help="run-length encoded indices",
+    )
+    parser.add_argument("--header", action="store_true", help="--check headered")
+    parser.add_argument("--band-rows", type=int, default=0, help="--check band rows")
+    parser.add_argument("--png", help="with --diff, write a preview of differences")
+    args = parser.parse_args(argv)
+    if args.compressed and not args.bpp:
+        parser.error("--compressed needs --bpp")
 
-# convert each to 8-bit RGB
-def bgr555_to_rgb888(c):
-    b = (c) & 0x1F
-    g = (c >> 5) & 0x1F
-    r = (c >> 10) & 0x1F
-    return ((r << 3) | (r >> 2), (g << 3) | (g >> 2), (b << 3) | (b >> 2))
+    if args.check:
+        bad = check_round_trip(
+            args.input, args.bpp, args.compressed, args.header, args.band_rows
+        )
+        print(f"{bad} pixels differ" if bad else "round trip ok")
+        return 1 if bad else 0
+    if args.output is None:
+        parser.error("output is required")
+    a = load_asset(args.input, args.width, args.bpp, args.compressed)
+    if not args.diff:
+        save_png(a, args.output)
+        print(f"{args.input}: {a.shape[1]}x{a.shape[0]}")
+        return 0
+    b = load_asset(args.output, args.width, args.bpp, args.compressed)
+    mask = diff_assets(a, b)
+    count = int(np.count_nonzero(mask))
+    if args.png:
+        diff_preview(a, mask).save(args.png)
+    if a.shape != b.shape:
+        print(f"sizes differ: {a.shape[1]}x{a.shape[0]} vs {b.shape[1]}x{b.shape[0]}")
+    if not count:
+        print("identical")
+        return 0
+    print(f"{count} of {mask.size} pixels differ ({_bounds(mask)})")
+    return 1
 
 
-rgb_pixels = [bgr555_to_rgb888(c) for c in pixels]
-# you can then reshape into 32 rows of 512 pixels each
+if __name__ == "__main__":
+    sys.exit(main())
@@ -54,3 +54,13 @@ class DirectionTuple:
         elif direction[1] > 0:
             parts.append(DirectionTuple.S)
         return parts
+
+    @staticmethod
+    def index(direction: Direction) -> int:
+        """Small int identifying a direction, for indexing precomputed tables.
+        Ranges over 0..FACING_COUNT - 1; (0, 0) maps to the middle entry."""
+        return (direction[0] + 1) + (direction[1] + 1) * 3
+
+
+# number of entries in tables indexed by DirectionTuple.index
+FACING_COUNT = 9
@@ -0,0 +1,235 @@
+import math
+
+import sasppu
+
+from .constants import SCREEN_WIDTH, SCREEN_HEIGHT
+
+# HDMA tables used by the effects; bit i of sasppu.hdma_enable turns on table i.
+# Fade and wipe change once per frame, so each is a single entry on line 0 that
+# is switched at the frame boundary. The wobble needs every line, so each of its
+# phases is a whole table, filled once, and animating it only moves the enable bit.
+FADE_TABLE = 0
+WIPE_TABLE = 1
+WOBBLE_TABLE = 2
+WOBBLE_PHASES_MAX = 6
+
+# fixed point sine, one full turn in SINE_STEPS, scaled by SINE_ONE
+SINE_STEPS = 64
+SINE_ONE = 127
+
+
+def _sine_table() -> bytes:
+    return bytes(
+        round(math.sin(i * 2 * math.pi / SINE_STEPS) * SINE_ONE) & 0xFF
+        for i in range(SINE_STEPS)
+    )
+
+
+SINE = _sine_table()
+
+
+def sine(step: int) -> int:
+    """sin(step * 2pi / SINE_STEPS) * SINE_ONE, from the table."""
+    value = SINE[step % SINE_STEPS]
+    return value - 256 if value > 127 else value
+
+
+def ramp(frames: int, start: int, end: int) -> bytearray:
+    """Per-frame values easing from start to end (quadratic ease-out)."""
+    out = bytearray(frames)
+    last = frames - 1
+    if last <= 0:
+        out[:] = bytes((end,)) * frames
+        return out
+    for frame in range(frames):
+        left = last - frame
+        out[frame] = end + (start - end) * left * left // (last * last)
+    return out
+
+
+def _tables() -> tuple:
+    return (
+        sasppu.hdma_0,
+        sasppu.hdma_1,
+        sasppu.hdma_2,
+        sasppu.hdma_3,
+        sasppu.hdma_4,
+        sasppu.hdma_5,
+        sasppu.hdma_6,
+        sasppu.hdma_7,
+    )
+
+
+def _copy_main(src: sasppu.MainState) -> sasppu.MainState:
+    dst = sasppu.MainState()
+    dst.mainscreen_colour = src.mainscreen_colour
+    dst.subscreen_colour = src.subscreen_colour
+    dst.window_1_left = src.window_1_left
+    dst.window_1_right = src.window_1_right
+    dst.window_2_left = src.window_2_left
+    dst.window_2_right = src.window_2_right
+    dst.bgcol_windows = src.bgcol_windows
+    dst.bgcol_window_1 = src.bgcol_window_1
+    dst.bgcol_window_2 = src.bgcol_window_2
+    dst.flags = src.flags
+    return dst
+
+
+def _copy_background(src: sasppu.Background) -> sasppu.Background:
+    dst = sasppu.Background()
+    dst.x = src.x
+    dst.y = src.y
+    dst.windows = src.windows
+    dst.window_1 = src.window_1
+    dst.window_2 = src.window_2
+    dst.flags = src.flags
+    return dst
+
+
+class Effects:
+    """
+    Screen effects driven by HDMA: a fade (colour math fade level), a window wipe
+    (window 1 opening out from the centre) and a sine wobble of a background's x.
+
+    Everything is computed when an effect is started; update(), called once per
+    frame, only picks the precomputed state for the frame and switches HDMA
+    entries and enable bits, so the hardware does the per-line work.
+
+    The entries are whole copies of the bound states, taken when the effect is
+    started, so the states should not be changed while it runs: the wobble in
+    particular holds the background scroll it started with.
+    """
+
+    ms: sasppu.MainState
+    cs: sasppu.CMathState
+    background: sasppu.Background
+    background_index: int
+
+    def __init__(
+        self,
+        ms: sasppu.MainState,
+        cs: sasppu.CMathState,
+        background: sasppu.Background,
+        background_index: int = 0,
+    ):
+        self.ms = ms
+        self.cs = cs
+        self.background = background
+        self.background_index = background_index
+        self._tables = _tables()
+        self._enabled = 0
+        # per-frame states of the running fade and wipe, and how far along they are
+        self._fade: list = []
+        self._fade_frame = 0
+        self._wipe: list = []
+        self._wipe_frame = 0
+        self._wobble_frames = 0
+        self._wobble_phases = 0
+        self._wobble_ticks = 1
+        self._wobble_frame = 0
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._fade or self._wipe or self._wobble_frames)
+
+    def fade(self, frames: int, start: int = 255, end: int = 0) -> None:
+        """Fade from one colour math fade level to another over some frames
+        (255 is black, 0 the unfaded picture)."""
+        flags = self.cs.flags | sasppu.CMathState.FADE_ENABLE
+        states = []
+        for level in ramp(frames, start, end):
+            state = sasppu.CMathState()
+            state.flags = flags
+            state.fade = level
+            states.append(state)
+        self._fade = states
+        self._fade_frame = 0
+
+    def wipe(self, frames: int, center: int = SCREEN_WIDTH // 2) -> None:
+        """Open window 1 out from a point to its current edges over some frames."""
+        left = self.ms.window_1_left
+        right = self.ms.window_1_right
+        lefts = ramp(frames, center, left)
+        rights = ramp(frames, center, right)
+        states = []
+        for frame in range(frames):
+            state = _copy_main(self.ms)
+            state.window_1_left = lefts[frame]
+            state.window_1_right = rights[frame]
+            states.append(state)
+        self._wipe = states
+        self._wipe_frame = 0
+
+    def wobble(
+        self,
+        frames: int,
+        amplitude: int = 4,
+        period: int = 32,
+        phases: int = 4,
+        ticks_per_phase: int = 4,
+    ) -> None:
+        """Ripple the background sideways, a sine of the line number, for some
+        frames. Each phase is a full HDMA table, filled here; only lines where
+        the offset changes get an entry, and lines with the same offset share
+        one Background state."""
+        phases = min(phases, WOBBLE_PHASES_MAX)
+        index = self.background_index
+        base_x = self.background.x
+        states = {}
+        for phase in range(phases):
+            table = self._tables[WOBBLE_TABLE + phase]
+            shift = phase * period // phases
+            previous = None
+            for line in range(SCREEN_HEIGHT):
+                offset = (
+                    sine((line + shift) * SINE_STEPS // period) * amplitude // SINE_ONE
+                )
+                if offset == previous:
+                    table[line] = None
+                    continue
+                previous = offset
+                entry = states.get(offset)
+                if entry is None:
+                    state = _copy_background(self.background)
+                    state.x = base_x + offset
+                    entry = states[offset] = (index, state)
+                table[line] = entry
+        self._wobble_frames = frames
+        self._wobble_phases = phases
+        self._wobble_ticks = ticks_per_phase
+        self._wobble_frame = 0
+
+    def stop(self) -> None:
+        """End every effect at once, leaving the bound states in charge."""
+        self._fade = []
+        self._wipe = []
+        self._wobble_frames = 0
+        self._enable(0)
+
+    def _enable(self, enabled: int) -> None:
+        if enabled != self._enabled:
+            self._enabled = enabled
+            sasppu.hdma_enable = enabled
+
+    def update(self) -> None:
+        """Switch to this frame's entries. Call once per frame, between frames."""
+        enabled = 0
+        if self._fade:
+            self._tables[FADE_TABLE][0] = self._fade[self._fade_frame]
+            self._fade_frame += 1
+            if self._fade_frame >= len(self._fade):
+                self._fade = []
+            enabled |= 1 << FADE_TABLE
+        if self._wipe:
+            self._tables[WIPE_TABLE][0] = self._wipe[self._wipe_frame]
+            self._wipe_frame += 1
+            if self._wipe_frame >= len(self._wipe):
+                self._wipe = []
+            enabled |= 1 << WIPE_TABLE
+        if self._wobble_frames:
+            phase = self._wobble_frame // self._wobble_ticks % self._wobble_phases
+            self._wobble_frame += 1
+            if self._wobble_frame >= self._wobble_frames:
+                self._wobble_frames = 0
+            enabled |= 1 << (WOBBLE_TABLE + phase)
+        self._enable(enabled)
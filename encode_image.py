@@ -1,8 +1,51 @@
 #!/usr/bin/env python3
-import sys
+"""
+Asset compiler: converts images into the formats the sasppu blitters take.
+
+    python encode_image.py input.png output.bin [--bpp N] [--compress] [--header]
+    python encode_image.py --dir images/ out/ [--bpp N] [--compress] [--header]
+                           [--jobs N]
+
+Without --bpp the output is raw BGR555 (what blit_sprite/blit_background take).
+With --bpp 2/4/8 the image is quantized to a palette of at most 2**bpp colours
+and written as packed palette indices for paletted_sprite, with the palette
+next to it in a .pal file (little-endian BGR555 entries). --compress also
+run-length encodes the indices, for compressed_sprite.
+
+--header writes a single self-describing file for AssetLoader instead: a small
+header (size, encoding, bit depth, palette size), the palette and the data.
+Compressed data is then split into independently compressed bands of
+--band-rows rows, so the device can stream it through a small buffer.
+
+In --dir mode every image in the directory is converted across a process pool,
+and inputs whose content (and options) have not changed since the last run are
+skipped, using a content-hash cache stored in the output directory.
+"""
+
+import argparse
+import hashlib
+import json
+import os
 import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from PIL import Image
 
+IMAGE_EXTENSIONS = (".png", ".bmp", ".gif", ".jpg", ".jpeg")
+CACHE_FILENAME = ".encode_cache.json"
+# bump when the output format changes, to invalidate the cache
+ENCODER_VERSION = 2
+
+# asset header, must match asset_loader.py
+ASSET_MAGIC = b"SPPU"
+HEADER_FORMAT = "<4sHHBBHH"
+ENCODING_RAW = 0
+ENCODING_PALETTED = 1
+ENCODING_COMPRESSED = 2
+DEFAULT_BAND_ROWS = 16
+
 
 def rgb888_to_bgr555(r, g, b):
     # down-scale 8-bit to 5-bit
@@ -13,18 +56,265 @@ def rgb888_to_bgr555(r, g, b):
     return (b5) | (g5 << 5) | (r5 << 10)
 
 
-def encode_image(input_png, output_bin):
-    img = Image.open(input_png).convert("RGB")
-    w, h = img.size
-    pixels = list(img.getdata())
+def image_to_bgr555(img: Image.Image) -> np.ndarray:
+    """Convert a whole image to a (height, width) uint16 array of BGR555 values.
+    Same result as rgb888_to_bgr555 per pixel, in one vectorized pass."""
+    rgb = np.asarray(img.convert("RGB"), dtype=np.uint16)
+    return rgb888_to_bgr555(rgb[..., 0], rgb[..., 1], rgb[..., 2]).astype(np.uint16)
+
+
+def quantize(pixels: np.ndarray, bpp: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce BGR555 pixels to a palette of at most 2**bpp colours.
+
+    Returns (indices, palette). If the image already has few enough colours the
+    palette is exact; otherwise the most frequent colours are kept and the rest
+    are mapped to the nearest of them. Colour 0 (transparent black) is kept at
+    index 0 whenever it occurs, so transparency survives quantization.
+    """
+    size = 1 << bpp
+    colours, inverse, counts = np.unique(
+        pixels.ravel(), return_inverse=True, return_counts=True
+    )
+    order = np.argsort(-counts, kind="stable")
+    if colours[0] == 0:
+        # np.unique sorts, so transparent black is colours[0]; put it first
+        order = np.concatenate(([0], order[order != 0]))
+    keep = order[:size]
+    palette = colours[keep]
+
+    # index of each unique colour in the palette (nearest if it was dropped)
+    def channels(c):
+        c = c.astype(np.int32)
+        return np.stack(((c >> 10) & 31, (c >> 5) & 31, c & 31), axis=-1)
+
+    distances = (
+        (channels(colours)[:, None, :] - channels(palette)[None, :, :]) ** 2
+    ).sum(axis=-1)
+    if palette[0] == 0 and len(palette) > 1:
+        # opaque colours must not land on transparent black, however close
+        distances[colours != 0, 0] = np.iinfo(distances.dtype).max
+    colour_to_index = distances.argmin(axis=1).astype(np.uint8)
+    indices = colour_to_index[inverse].reshape(pixels.shape)
+    return indices, palette.astype(np.uint16)
+
+
+def pack_indices(indices: np.ndarray, bpp: int) -> bytes:
+    """Pack palette indices, lowest bits first within each byte; each row is
+    padded to a whole number of bytes."""
+    if bpp == 8:
+        return indices.astype(np.uint8).tobytes()
+    per_byte = 8 // bpp
+    height, width = indices.shape
+    padded_width = -(-width // per_byte) * per_byte
+    rows = np.zeros((height, padded_width), dtype=np.uint8)
+    rows[:, :width] = indices
+    groups = rows.reshape(height, padded_width // per_byte, per_byte)
+    shifts = (np.arange(per_byte, dtype=np.uint8) * bpp).astype(np.uint8)
+    return np.bitwise_or.reduce(groups << shifts, axis=-1).astype(np.uint8).tobytes()
+
+
+def compress_indices(indices: np.ndarray) -> bytes:
+    """Run-length encode palette indices in row-major order, as
+    (run length - 1, index) byte pairs with runs of at most 256 pixels."""
+    flat = indices.ravel().astype(np.uint8)
+    if not flat.size:
+        return b""
+    starts = np.flatnonzero(np.concatenate(([True], flat[1:] != flat[:-1])))
+    lengths = np.diff(np.concatenate((starts, [flat.size])))
+    values = flat[starts]
+    # split runs longer than 256
+    pieces = -(-lengths // 256)
+    values = np.repeat(values, pieces)
+    run_lengths = np.full(values.size, 256, dtype=np.int64)
+    last = np.cumsum(pieces) - 1
+    run_lengths[last] = lengths - (pieces - 1) * 256
+    out = np.empty(values.size * 2, dtype=np.uint8)
+    out[0::2] = run_lengths - 1
+    out[1::2] = values
+    return out.tobytes()
+
+
+def encode_asset(
+    pixels: np.ndarray, bpp: int = 0, compress: bool = False, band_rows: int = 0
+) -> bytes:
+    """Encode BGR555 pixels as a headered asset (see asset_loader.py)."""
+    height, width = pixels.shape
+    if not bpp:
+        header = struct.pack(
+            HEADER_FORMAT, ASSET_MAGIC, width, height, ENCODING_RAW, 16, 0, 0
+        )
+        return header + pixels.astype("<u2").tobytes()
+    indices, palette = quantize(pixels, bpp)
+    palette_bytes = palette.astype("<u2").tobytes()
+    if not compress:
+        header = struct.pack(
+            HEADER_FORMAT,
+            ASSET_MAGIC,
+            width,
+            height,
+            ENCODING_PALETTED,
+            bpp,
+            len(palette),
+            0,
+        )
+        return header + palette_bytes + pack_indices(indices, bpp)
+    band_rows = band_rows or DEFAULT_BAND_ROWS
+    header = struct.pack(
+        HEADER_FORMAT,
+        ASSET_MAGIC,
+        width,
+        height,
+        ENCODING_COMPRESSED,
+        bpp,
+        len(palette),
+        band_rows,
+    )
+    bands = []
+    for row in range(0, height, band_rows):
+        band = compress_indices(indices[row : row + band_rows])
+        if len(band) > 0xFFFF:
+            raise ValueError("Compressed band too large, use fewer --band-rows")
+        bands.append(struct.pack("<H", len(band)) + band)
+    return header + palette_bytes + b"".join(bands)
+
+
+def encode_image(
+    input_png,
+    output_bin,
+    bpp: int = 0,
+    compress: bool = False,
+    header: bool = False,
+    band_rows: int = 0,
+):
+    """Convert one image. bpp 0 means raw BGR555."""
+    img = Image.open(input_png)
+    pixels = image_to_bgr555(img)
+    if header:
+        with open(output_bin, "wb") as f:
+            f.write(encode_asset(pixels, bpp, compress, band_rows))
+        return
+    if not bpp:
+        with open(output_bin, "wb") as f:
+            f.write(pixels.astype("<u2").tobytes())
+        return
+    indices, palette = quantize(pixels, bpp)
+    data = compress_indices(indices) if compress else pack_indices(indices, bpp)
     with open(output_bin, "wb") as f:
-        for r, g, b in pixels:
-            val = rgb888_to_bgr555(r, g, b)
-            f.write(struct.pack("<H", val))
+        f.write(data)
+    with open(os.path.splitext(output_bin)[0] + ".pal", "wb") as f:
+        f.write(palette.astype("<u2").tobytes())
+
+
+def _content_hash(path: str, options: tuple) -> str:
+    h = hashlib.sha256()
+    h.update(f"{ENCODER_VERSION}:{options}:".encode())
+    with open(path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def _encode_job(job: tuple) -> str:
+    input_path, output_path, options = job
+    encode_image(input_path, output_path, *options)
+    return input_path
+
+
+def encode_directory(
+    input_dir: str,
+    output_dir: str,
+    bpp: int = 0,
+    compress: bool = False,
+    header: bool = False,
+    band_rows: int = 0,
+    jobs=None,
+) -> tuple[int, int]:
+    """Convert every image in input_dir into output_dir, skipping unchanged ones.
+    Returns (converted, skipped)."""
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE_FILENAME)
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    options = (bpp, compress, header, band_rows)
+    todo = []
+    hashes = {}
+    skipped = 0
+    for name in sorted(os.listdir(input_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        input_path = os.path.join(input_dir, name)
+        output_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".bin")
+        digest = _content_hash(input_path, options)
+        if cache.get(name) == digest and os.path.exists(output_path):
+            skipped += 1
+            continue
+        hashes[input_path] = (name, digest)
+        todo.append((input_path, output_path, options))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for input_path in pool.map(_encode_job, todo):
+                name, digest = hashes[input_path]
+                cache[name] = digest
+                print(f"encoded {name}")
+        with open(cache_path, "w") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    return len(todo), skipped
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="image file, or directory with --dir")
+    parser.add_argument("output", help="output .bin file, or directory with --dir")
+    parser.add_argument("--dir", action="store_true", help="convert a whole directory")
+    parser.add_argument(
+        "--bpp",
+        type=int,
+        default=0,
+        choices=(0, 1, 2, 4, 8),
+        help="palette bit depth (0 = raw BGR555)",
+    )
+    parser.add_argument(
+        "--compress", action="store_true", help="run-length encode paletted output"
+    )
+    parser.add_argument(
+        "--header", action="store_true", help="write a headered asset for AssetLoader"
+    )
+    parser.add_argument(
+        "--band-rows",
+        type=int,
+        default=0,
+        help=f"rows per compressed band with --header (default {DEFAULT_BAND_ROWS})",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes")
+    args = parser.parse_args(argv)
+    if args.compress and not args.bpp:
+        parser.error("--compress needs --bpp")
+    if args.dir:
+        converted, skipped = encode_directory(
+            args.input,
+            args.output,
+            args.bpp,
+            args.compress,
+            args.header,
+            args.band_rows,
+            args.jobs,
+        )
+        print(f"{converted} converted, {skipped} unchanged")
+    else:
+        encode_image(
+            args.input,
+            args.output,
+            args.bpp,
+            args.compress,
+            args.header,
+            args.band_rows,
+        )
+    return 0
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python encode.py input.png output.bin")
-        sys.exit(1)
-    encode_image(sys.argv[1], sys.argv[2])
+    sys.exit(main())
@@ -0,0 +1,156 @@
+from array import array
+
+from .kinds import KIND_COUNT
+from .packing import zeros
+
+# id 0 is never an entity: it means "nothing" in the occupancy grids, and in
+# World's draw order it stands for the player
+NO_ENTITY = 0
+PLAYER = 0
+
+# (column, typecode, item size) of every per-entity column
+COLUMNS = (
+    # one of the KIND_* constants in kinds.py
+    ("kind", "B", 1),
+    # sprite flags without ENABLED, e.g. FLIP_X
+    ("flags", "B", 1),
+    ("tile_x", "h", 2),
+    ("tile_y", "h", 2),
+    # physical OAM slot, or -1 while off screen
+    ("slot", "h", 2),
+    # bookkeeping for World.update: frame last in view (low 16 bits), screen
+    # position, distance from the camera centre and draw order key
+    ("seen", "H", 2),
+    ("screen_x", "h", 2),
+    ("screen_y", "h", 2),
+    ("distance", "H", 2),
+    ("depth", "i", 4),
+)
+# most entities the 16-bit ids (as stored in the occupancy grids) can name
+MAX_ENTITIES = 0xFFFF
+
+
+class EntityStore:
+    """
+    World objects as parallel columns, one array per field, indexed by a small
+    integer id that stays the same for as long as the entity exists.
+
+    Ids are recycled from a free stack, and each kind keeps its ids packed at
+    the front of an array (with each id's position in it remembered), so add()
+    and remove() are O(1), a kind's ids can be walked without building a list,
+    and once the columns have grown to the peak entity count nothing else is
+    allocated. Columns grow by doubling.
+    """
+
+    capacity: int
+    kind: array
+    flags: array
+    tile_x: array
+    tile_y: array
+    slot: array
+    seen: array
+    screen_x: array
+    screen_y: array
+    distance: array
+    depth: array
+
+    def __init__(self, capacity: int = 64):
+        # id 0 is reserved, so the columns hold capacity + 1 rows
+        self.capacity = 0
+        for name, typecode, size in COLUMNS:
+            setattr(self, name, zeros(typecode, size, 1))
+        # free ids, lowest on top
+        self._free = zeros("H", 2, 0)
+        self._free_top = 0
+        # per kind: its ids, packed at the front, and how many there are
+        self._members = [zeros("H", 2, 0) for _ in range(KIND_COUNT)]
+        self._counts = [0] * KIND_COUNT
+        # per id: its index in its kind's member array
+        self._position = zeros("H", 2, 1)
+        self._alive = bytearray(1)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int) -> None:
+        capacity = min(capacity, MAX_ENTITIES)
+        extra = capacity - self.capacity
+        if extra <= 0:
+            raise ValueError("No free entity ids available")
+        for name, typecode, size in COLUMNS:
+            getattr(self, name).extend(zeros(typecode, size, extra))
+        self._position.extend(zeros("H", 2, extra))
+        self._alive.extend(bytes(extra))
+        # the member arrays and free stack are as long as the columns, so add()
+        # and remove() only ever resize arrays here, when the store is full
+        for members in self._members:
+            members.extend(zeros("H", 2, extra))
+        free = self._free
+        free.extend(zeros("H", 2, extra))
+        top = self._free_top
+        for entity in range(capacity, self.capacity, -1):
+            free[top] = entity
+            top += 1
+        self._free_top = top
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.capacity - self._free_top
+
+    def __contains__(self, entity: int) -> bool:
+        return 0 < entity <= self.capacity and bool(self._alive[entity])
+
+    def add(self, kind: int, flags: int = 0) -> int:
+        """Create an entity of a kind and return its id. Its other fields are
+        reset: tile (0, 0), no OAM slot."""
+        if not self._free_top:
+            self._grow(self.capacity * 2)
+        self._free_top -= 1
+        entity = self._free[self._free_top]
+        self._alive[entity] = 1
+        self.kind[entity] = kind
+        self.flags[entity] = flags
+        self.tile_x[entity] = 0
+        self.tile_y[entity] = 0
+        self.slot[entity] = -1
+        self.seen[entity] = 0
+        self.depth[entity] = 0
+        count = self._counts[kind]
+        self._members[kind][count] = entity
+        self._position[entity] = count
+        self._counts[kind] = count + 1
+        return entity
+
+    def remove(self, entity: int) -> None:
+        """Delete an entity; its id will be reused."""
+        if entity not in self:
+            raise ValueError(f"No entity {entity}")
+        self._alive[entity] = 0
+        kind = self.kind[entity]
+        # swap the kind's last id into the hole
+        members = self._members[kind]
+        count = self._counts[kind] - 1
+        position = self._position[entity]
+        last = members[count]
+        members[position] = last
+        self._position[last] = position
+        self._counts[kind] = count
+        self._free[self._free_top] = entity
+        self._free_top += 1
+
+    def count(self, kind: int) -> int:
+        """Number of entities of a kind."""
+        return self._counts[kind]
+
+    def of_kind(self, kind: int) -> memoryview:
+        """The ids of one kind, as a view into the store (no copy). Only use it
+        until the next add() or remove(): removing reorders the ids, and add()
+        may grow the store, which reallocates the arrays (on CPython, growing
+        while a view is still referenced raises BufferError)."""
+        return memoryview(self._members[kind])[: self._counts[kind]]
+
+    def ids(self):
+        """Iterate over every entity id, kind by kind. Do not add or remove
+        entities while iterating."""
+        for kind in range(KIND_COUNT):
+            members = self._members[kind]
+            for i in range(self._counts[kind]):
+                yield members[i]
@@ -0,0 +1,94 @@
+from array import array
+
+from .packing import zeros
+
+
+class OccupancyGrid:
+    """
+    Dense width x height grid of entity ids (see entities.py), covering the
+    tiles from (origin_x, origin_y). Tiles are addressed in world tile
+    coordinates.
+    """
+
+    width: int
+    height: int
+    origin_x: int
+    origin_y: int
+    cells: array
+
+    def __init__(self, width: int, height: int, origin_x: int = 0, origin_y: int = 0):
+        self.width = width
+        self.height = height
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.cells = zeros("H", 2, width * height)
+
+    def index(self, tile_x: int, tile_y: int) -> int:
+        """Index of a tile in cells, or -1 if it is outside the grid."""
+        x = tile_x - self.origin_x
+        y = tile_y - self.origin_y
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return -1
+        return y * self.width + x
+
+    def get(self, tile_x: int, tile_y: int) -> int:
+        """Entity id on a tile, 0 if it is empty or outside the grid."""
+        i = self.index(tile_x, tile_y)
+        return self.cells[i] if i >= 0 else 0
+
+
+class IndexedFreeSet:
+    """
+    Set of integers in [0, capacity) with O(1) add, remove, membership and
+    random pick: members are packed at the front of one array, and a second
+    array remembers where each member sits.
+    """
+
+    def __init__(self, capacity: int, full: bool = False):
+        if capacity <= 0x10000:
+            typecode, size = "H", 2
+        else:
+            typecode, size = "I", 4
+        self.capacity = capacity
+        self._members = zeros(typecode, size, capacity)
+        self._position = zeros(typecode, size, capacity)
+        self._present = bytearray(capacity)
+        self._count = 0
+        if full:
+            for i in range(capacity):
+                self._members[i] = i
+                self._position[i] = i
+                self._present[i] = 1
+            self._count = capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self._present[value])
+
+    def add(self, value: int) -> None:
+        if self._present[value]:
+            return
+        self._present[value] = 1
+        self._members[self._count] = value
+        self._position[value] = self._count
+        self._count += 1
+
+    def remove(self, value: int) -> None:
+        if not self._present[value]:
+            return
+        self._present[value] = 0
+        self._count -= 1
+        last = self._members[self._count]
+        position = self._position[value]
+        self._members[position] = last
+        self._position[last] = position
+
+    def pick(self, rand: int) -> int:
+        """Remove and return the member at position rand % len(self)."""
+        if not self._count:
+            raise ValueError("Set is empty")
+        value = self._members[rand % self._count]
+        self.remove(value)
+        return value
@@ -0,0 +1,13 @@
+"""
+Host-side (PC) harness for running the app without a badge.
+
+host/stubs holds software stand-ins for the firmware modules the app imports
+(sasppu, app, events.input, system.eventbus, system.scheduler.events); the
+sasppu one rasterizes into NumPy arrays and counts native calls. host/run.py
+mounts the app the way the firmware does (as apps.saspputest) and runs it
+headless at full speed with scripted input:
+
+    python -m host.run --frames 600 --input "CONFIRM*120 CANCEL+RIGHT*60 DOWN*1"
+
+Nothing here is imported by the app itself or needed on the badge.
+"""
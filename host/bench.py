@@ -0,0 +1,87 @@
+"""
+Run the World scaling benchmarks (bench.py) on the host and check them against
+a JSON baseline.
+
+    python -m host.bench [--sizes 8,32,...] [--counts 16,256,...]
+                         [--baseline FILE] [--save] [--threshold 0.25]
+                         [--gate-time]
+
+Without --save, results are compared with the baseline and the run fails
+(exit status 1) if any case's memory regressed by more than the threshold.
+Slower times are reported, and marked when they are within the noise floor of
+the case (the spread of its samples, in the baseline or this run); they only
+fail the run with --gate-time, which is for an otherwise idle machine, since
+host timings under load swing by more than any useful threshold. --save
+writes the results as the new baseline instead. Baselines are only comparable
+between runs on the same machine.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from .run import install, APP_PACKAGE
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bench.json"
+)
+
+
+def _ints(text: str) -> tuple:
+    return tuple(int(part) for part in text.split(",") if part)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=_ints, default=None, help="world sizes")
+    parser.add_argument("--counts", type=_ints, default=None, help="object counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write a new baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed relative regression"
+    )
+    parser.add_argument(
+        "--gate-time",
+        action="store_true",
+        help="also fail on time regressions past the noise floor",
+    )
+    args = parser.parse_args(argv)
+    baseline_path = os.path.abspath(args.baseline)
+
+    install()
+    import importlib
+
+    bench = importlib.import_module(APP_PACKAGE + ".bench")
+    sizes = args.sizes or bench.DEFAULT_SIZES
+    counts = args.counts or bench.DEFAULT_COUNTS
+
+    def log(line: str) -> None:
+        print(line, file=sys.stderr)
+
+    results = bench.run_suite(sizes, counts, args.repeat, log)
+
+    if args.save:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"saved {len(results)} cases to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path}; run with --save first")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions, notes = bench.compare(
+        results, baseline, args.threshold, gate_time=args.gate_time
+    )
+    for line in notes:
+        print(line)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(results)} cases, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Run the app headless on a PC, at full speed, with scripted input.
+
+    python -m host.run [--frames N] [--input SCRIPT] [--render-every N]
+                       [--png out.png] [--seed N] [--profile N]
+                       [--record LOG | --replay LOG] [--realtime]
+                       [--snapshot FILE]
+
+An input script is a space-separated list of BUTTONS*FRAMES steps, where
+BUTTONS is a +-joined list of button names (or empty, for nothing held), e.g.
+"CONFIRM*120 CANCEL+RIGHT*60 DOWN*1 *30". Buttons are released after the last
+step. Rendering is off by default so runs measure the app, not the emulator.
+Every frame is one simulation tick unless --realtime is given, in which case the
+app's fixed-timestep clock runs on wall time as it does on the badge.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HOST_DIR)
+STUBS_DIR = os.path.join(HOST_DIR, "stubs")
+# where the firmware mounts the app; ASSET_PATH is relative to its parent
+APP_PACKAGE = "apps.saspputest"
+
+_mount_dir = None
+
+
+def _install_ticks() -> None:
+    """MicroPython's time.ticks_* functions, which CPython does not have."""
+    if hasattr(time, "ticks_us"):
+        return
+    start = time.perf_counter_ns()
+    time.ticks_ms = lambda: (time.perf_counter_ns() - start) // 1_000_000
+    time.ticks_us = lambda: (time.perf_counter_ns() - start) // 1_000
+    time.ticks_cpu = lambda: time.perf_counter_ns() - start
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1_000_000)
+
+
+def install() -> str:
+    """Put the stand-in firmware modules on sys.path and mount the app as
+    apps.saspputest in a scratch directory, which becomes the working
+    directory. Safe to call more than once; returns the mount directory."""
+    global _mount_dir
+    if _mount_dir is not None:
+        return _mount_dir
+    _install_ticks()
+    sys.path.insert(0, STUBS_DIR)
+    _mount_dir = tempfile.mkdtemp(prefix="saspputest-")
+    os.makedirs(os.path.join(_mount_dir, "apps"))
+    os.symlink(APP_DIR, os.path.join(_mount_dir, *APP_PACKAGE.split(".")))
+    sys.path.insert(0, _mount_dir)
+    os.chdir(_mount_dir)
+    return _mount_dir
+
+
+class InputScript:
+    """Scripted button presses, emitted as button events frame by frame."""
+
+    def __init__(self, script: str = ""):
+        # (first frame after the step, buttons held during it)
+        self.steps: list[tuple[int, frozenset]] = []
+        frame = 0
+        for token in script.split():
+            buttons, _, frames = token.rpartition("*")
+            if not frames.isdigit():
+                raise ValueError(f"Bad input step {token!r}, expected BUTTONS*FRAMES")
+            frame += int(frames)
+            names = frozenset(name for name in buttons.split("+") if name)
+            self.steps.append((frame, names))
+        self.length = frame
+        self._held = frozenset()
+        self._step = 0
+
+    def held(self, frame: int) -> frozenset:
+        while self._step < len(self.steps) and frame >= self.steps[self._step][0]:
+            self._step += 1
+        if self._step < len(self.steps):
+            return self.steps[self._step][1]
+        return frozenset()
+
+    def step(self, frame: int) -> None:
+        """Emit the button events that take the held set to what it is at frame."""
+        from events.input import BUTTON_TYPES, ButtonDownEvent, ButtonUpEvent
+        from system.eventbus import eventbus
+
+        held = self.held(frame)
+        for name in self._held - held:
+            eventbus.emit(ButtonUpEvent(BUTTON_TYPES[name]))
+        for name in held - self._held:
+            eventbus.emit(ButtonDownEvent(BUTTON_TYPES[name]))
+        self._held = held
+
+
+def create_app(
+    profile_frames: int = 0,
+    quiet: bool = True,
+    replay_mode: str | None = None,
+    replay_path: str | None = None,
+    realtime: bool = False,
+    snapshot_path: str | None = None,
+):
+    """Import and construct the app against the stand-in firmware. The world
+    snapshot is only saved and restored if `snapshot_path` is given."""
+    install()
+    import importlib
+
+    module = importlib.import_module(APP_PACKAGE + ".app")
+    module.PROFILE_FRAMES = profile_frames
+    module.SIM_LOCKSTEP = not realtime
+    module.SNAPSHOT_PATH = snapshot_path
+    module.REPLAY_MODE = replay_mode
+    if replay_path is not None:
+        module.REPLAY_PATH = replay_path
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        return module.SASPPUTest()
+
+
+def run_headless(
+    frames: int = 600,
+    script: str = "",
+    render_every: int = 0,
+    seed: int | None = None,
+    profile_frames: int = 0,
+    quiet: bool = True,
+    app=None,
+    on_frame=None,
+    record: str | None = None,
+    replay: str | None = None,
+    realtime: bool = False,
+    snapshot: str | None = None,
+) -> dict:
+    """Run the app for a number of frames. Returns the app, wall time, native
+    call counts and the last rendered frame (if any).
+
+    With `record`, the session's input log is written to that path at the
+    end. With `replay`, input comes from that log instead of the script, and
+    the run ends when the log does (or after `frames`)."""
+    install()
+    import sasppu
+
+    if seed is not None:
+        random.seed(seed)
+    if app is None:
+        mode = "replay" if replay else "record" if record else None
+        app = create_app(
+            profile_frames, quiet, mode, replay or record, realtime, snapshot
+        )
+    inputs = InputScript(script)
+    sasppu.reset_counts()
+    result = {"app": app, "frames": 0, "image": None}
+    inputs.step(0)
+
+    async def render_update():
+        frame = result["frames"]
+        if render_every and frame % render_every == 0:
+            result["image"] = sasppu.render()
+        if on_frame is not None:
+            on_frame(frame)
+        frame += 1
+        result["frames"] = frame
+        if frame >= frames:
+            app.exit = True
+        inputs.step(frame)
+
+    output = io.StringIO() if quiet else sys.stdout
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        asyncio.run(app.run(render_update))
+    result["seconds"] = time.perf_counter() - start
+    if app.recorder is not None:
+        app.recorder.save(record)
+    if snapshot is not None:
+        app.save_snapshot()
+    result["calls"] = dict(sasppu.calls)
+    return result
+
+
+def save_png(frame, path: str) -> None:
+    import sasppu
+    from PIL import Image
+
+    Image.fromarray(sasppu.to_rgb888(frame), "RGB").save(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--input", default="", help="input script, see above")
+    parser.add_argument(
+        "--render-every", type=int, default=0, help="rasterize every N frames"
+    )
+    parser.add_argument("--png", help="save the last frame as a PNG")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument(
+        "--profile", type=int, default=0, help="profile the last N frames and dump"
+    )
+    parser.add_argument("--record", help="write the session's input log here")
+    parser.add_argument(
+        "--replay", help="replay an input log (until it ends) instead of --input"
+    )
+    parser.add_argument(
+        "--realtime", action="store_true", help="simulate on wall time, not per frame"
+    )
+    parser.add_argument(
+        "--snapshot", help="restore the world from this file, and save it at the end"
+    )
+    parser.add_argument("--verbose", action="store_true", help="show app output")
+    args = parser.parse_args(argv)
+
+    # the run changes directory to where the app is mounted
+    png = os.path.abspath(args.png) if args.png else None
+    record = os.path.abspath(args.record) if args.record else None
+    replay = os.path.abspath(args.replay) if args.replay else None
+    snapshot = os.path.abspath(args.snapshot) if args.snapshot else None
+    result = run_headless(
+        frames=sys.maxsize if replay else args.frames,
+        script=args.input,
+        render_every=args.render_every,
+        seed=args.seed,
+        profile_frames=args.profile,
+        quiet=not args.verbose,
+        record=record,
+        replay=replay,
+        realtime=args.realtime,
+        snapshot=snapshot,
+    )
+    if png:
+        import sasppu
+
+        save_png(sasppu.render(), png)
+    frames = result["frames"]
+    seconds = result["seconds"]
+    print(f"{frames} frames in {seconds:.3f}s ({frames / seconds:.0f} fps)")
+    print("native calls per frame:")
+    for name, count in sorted(result["calls"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:32} {count / frames:10.2f}")
+    app = result["app"]
+    if app.profiler is not None:
+        app.profiler.dump()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""Stand-in for the firmware's app module: just enough of SASPPUApp to
+construct and run the app headless."""
+
+
+class SASPPUApp:
+    def __init__(self):
+        pass
@@ -0,0 +1,51 @@
+"""Stand-in for the firmware's events.input: buttons and button events."""
+
+from system.eventbus import eventbus
+
+
+class Button:
+    def __init__(self, name: str, group: str = "System"):
+        self.name = name
+        self.group = group
+
+    def __contains__(self, other) -> bool:
+        return other is self
+
+    def __repr__(self) -> str:
+        return f"Button({self.name!r})"
+
+
+BUTTON_TYPES = {
+    name: Button(name) for name in ("UP", "DOWN", "LEFT", "RIGHT", "CANCEL", "CONFIRM")
+}
+
+
+class ButtonDownEvent:
+    def __init__(self, button: Button):
+        self.button = button
+
+
+class ButtonUpEvent:
+    def __init__(self, button: Button):
+        self.button = button
+
+
+class Buttons:
+    """Held button state, tracked from button events."""
+
+    def __init__(self, app):
+        self._held = set()
+        eventbus.on(ButtonDownEvent, self._down, app)
+        eventbus.on(ButtonUpEvent, self._up, app)
+
+    def _down(self, event: ButtonDownEvent):
+        self._held.add(event.button)
+
+    def _up(self, event: ButtonUpEvent):
+        self._held.discard(event.button)
+
+    def get(self, button: Button) -> bool:
+        return button in self._held
+
+    def clear(self) -> None:
+        self._held.clear()
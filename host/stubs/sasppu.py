@@ -0,0 +1,928 @@
+"""
+Software stand-in for the sasppu firmware module, for running the app on a PC.
+
+Implements the API in typings/sasppu.pyi on top of NumPy: sprite and background
+graphics memory, oam, the bg0/bg1 maps, bindable state objects, HDMA tables and
+the blit/fill/paletted/compressed/text primitives. render() composites a frame
+into a NumPy array, and every native call and register write is counted in
+`calls`, so host runs can show how much work a frame asks of the PPU.
+
+The real hardware's register encodings are not in the typings; where they
+matter the emulator picks its own and keeps them consistent with this repo
+(map entries as laid out in tilemap.py, compressed data as written by
+encode_image.py). Rendering is close enough to eyeball frames and compare
+runs, not a pixel-exact model of the PPU. Text is drawn as solid glyph cells.
+"""
+
+import numpy as np
+
+SCREEN_WIDTH = 240
+SCREEN_HEIGHT = 240
+
+SPRITE_COUNT = 256
+SPRITE_CACHE = 16
+MAP_WIDTH_POWER = 6
+MAP_HEIGHT_POWER = 6
+MAP_WIDTH = 1 << MAP_WIDTH_POWER
+MAP_HEIGHT = 1 << MAP_HEIGHT_POWER
+
+# graphics memory, in pixels
+GRAPHICS_WIDTH = 256
+GRAPHICS_HEIGHT = 256
+TILE_SIZE = 8
+TILES_PER_ROW = GRAPHICS_WIDTH // TILE_SIZE
+# map entries: tile index above the flip bits (see tilemap.py)
+MAP_FLIP_X = 0x1
+MAP_FLIP_Y = 0x2
+MAP_INDEX_SHIFT = 2
+
+# window regions: which of the two horizontal windows a pixel is in. A layer's
+# `windows` has one bit per region for the main screen and, shifted up by 4,
+# for the sub screen
+WINDOW_A = 0x1
+WINDOW_B = 0x2
+WINDOW_AB = 0x4
+WINDOW_X = 0x8
+WINDOW_ALL = 0xF
+
+BPP1 = 0
+BPP2 = 1
+BPP4 = 2
+BPP8 = 3
+_BITS = {BPP1: 1, BPP2: 2, BPP4: 4, BPP8: 8}
+
+ENABLED = 0x01
+PRIORITY = 0x02
+FLIP_X = 0x04
+FLIP_Y = 0x08
+C_MATH = 0x10
+DOUBLE = 0x20
+
+# colours are BGR555 with red in the high bits; bit 15 marks colour math
+CMATH_BIT = 0x8000
+TRANSPARENT_BLACK = 0x0000
+OPAQUE_BLACK = 0x0001
+RED = 0x7C00
+GREEN = 0x03E0
+BLUE = 0x001F
+WHITE = 0x7FFF
+
+HDMA_LINES = SCREEN_HEIGHT
+
+# native call and register write counts, by name
+calls: dict[str, int] = {}
+
+
+def _count(name: str) -> None:
+    calls[name] = calls.get(name, 0) + 1
+
+
+def reset_counts() -> None:
+    calls.clear()
+
+
+def _native(fn):
+    name = fn.__name__
+
+    def wrapper(*args, **kwargs):
+        calls[name] = calls.get(name, 0) + 1
+        return fn(*args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+class ImageCode:
+    Success = 0
+    TooWide = 1
+    TooTall = 2
+    InvalidBitdepth = 3
+
+
+# colour helpers
+
+
+@_native
+def rgb555(r: int, g: int, b: int) -> int:
+    return ((r & 31) << 10) | ((g & 31) << 5) | (b & 31)
+
+
+@_native
+def rgb555_cmath(r: int, g: int, b: int) -> int:
+    return rgb555(r, g, b) | CMATH_BIT
+
+
+@_native
+def rgb888(r: int, g: int, b: int) -> int:
+    return rgb555(r >> 3, g >> 3, b >> 3)
+
+
+@_native
+def rgb888_cmath(r: int, g: int, b: int) -> int:
+    return rgb888(r, g, b) | CMATH_BIT
+
+
+@_native
+def grey555(g: int) -> int:
+    return rgb555(g, g, g)
+
+
+@_native
+def grey555_cmath(g: int) -> int:
+    return grey555(g) | CMATH_BIT
+
+
+@_native
+def mul_rgb555(r: int, g: int, b: int, mul: int) -> int:
+    return rgb555((r * mul) >> 8, (g * mul) >> 8, (b * mul) >> 8)
+
+
+@_native
+def r_channel(col: int) -> int:
+    return (col >> 10) & 31
+
+
+@_native
+def g_channel(col: int) -> int:
+    return (col >> 5) & 31
+
+
+@_native
+def b_channel(col: int) -> int:
+    return col & 31
+
+
+@_native
+def cmath_channel(col: int) -> int:
+    return (col >> 15) & 1
+
+
+@_native
+def mul_col(col: int, mul: int) -> int:
+    return mul_rgb555(r_channel(col), g_channel(col), b_channel(col), mul) | (
+        col & CMATH_BIT
+    )
+
+
+# the macro_ variants compute the same values as the plain helpers
+macro_rgb555 = rgb555
+macro_rgb555_cmath = rgb555_cmath
+macro_rgb888 = rgb888
+macro_rgb888_cmath = rgb888_cmath
+macro_grey555 = grey555
+macro_grey555_cmath = grey555_cmath
+macro_mul_rgb555 = mul_rgb555
+macro_mul_col = mul_col
+macro_r_channel = r_channel
+macro_g_channel = g_channel
+macro_b_channel = b_channel
+macro_cmath_channel = cmath_channel
+
+
+def macro_cmath(col: int) -> int:
+    return col | CMATH_BIT
+
+
+def macro_mul_channel(col: int, mul: int) -> int:
+    return (col * mul) >> 8
+
+
+# registers
+
+
+class _Registers:
+    """Plain attribute registers whose writes are counted as Class.field."""
+
+    _fields: tuple = ()
+
+    def __init__(self):
+        for field in self._fields:
+            object.__setattr__(self, field, 0)
+
+    def __setattr__(self, name, value):
+        _count(f"{type(self).__name__}.{name}")
+        object.__setattr__(self, name, value)
+
+    def _copy_from(self, other) -> None:
+        for field in self._fields:
+            object.__setattr__(self, field, getattr(other, field))
+
+
+class Sprite(_Registers):
+    _fields = (
+        "x",
+        "y",
+        "width",
+        "height",
+        "graphics_x",
+        "graphics_y",
+        "windows",
+        "window_1",
+        "window_2",
+        "flags",
+    )
+
+    def __init__(self):
+        super().__init__()
+        object.__setattr__(self, "_bind_point", None)
+
+    def bind(self, bind_point: int, flush: bool = True) -> None:
+        _count("Sprite.bind")
+        oam._sprites[bind_point] = self
+        object.__setattr__(self, "_bind_point", bind_point)
+
+    def unbind(self) -> None:
+        if self._bind_point is not None:
+            oam._sprites[self._bind_point] = Sprite()
+        object.__setattr__(self, "_bind_point", None)
+
+    def get_bind_point(self):
+        return self._bind_point
+
+
+class Background(_Registers):
+    _fields = ("x", "y", "windows", "window_1", "window_2", "flags")
+
+    def __init__(self):
+        super().__init__()
+        object.__setattr__(self, "_bind_point", None)
+
+    def bind(self, bind_point: int, flush: bool = True) -> None:
+        _count("Background.bind")
+        _state.backgrounds[bind_point] = self
+        object.__setattr__(self, "_bind_point", bind_point)
+
+    def unbind(self) -> None:
+        if self._bind_point is not None:
+            _state.backgrounds[self._bind_point] = Background()
+        object.__setattr__(self, "_bind_point", None)
+
+    def get_bind_point(self):
+        return self._bind_point
+
+
+class MainState(_Registers):
+    SPR0_ENABLE = 0x01
+    SPR1_ENABLE = 0x02
+    BG0_ENABLE = 0x04
+    BG1_ENABLE = 0x08
+    CMATH_ENABLE = 0x10
+    BGCOL_WINDOW_ENABLE = 0x20
+
+    _fields = (
+        "mainscreen_colour",
+        "subscreen_colour",
+        "window_1_left",
+        "window_1_right",
+        "window_2_left",
+        "window_2_right",
+        "bgcol_windows",
+        "bgcol_window_1",
+        "bgcol_window_2",
+        "flags",
+    )
+
+    def bind(self, flush: bool = True) -> None:
+        _count("MainState.bind")
+        _state.main = self
+
+    def unbind(self) -> None:
+        if _state.main is self:
+            _state.main = MainState()
+
+    def get_bind_point(self) -> bool:
+        return _state.main is self
+
+
+class CMathState(_Registers):
+    HALF_MAIN_SCREEN = 0x01
+    DOUBLE_MAIN_SCREEN = 0x02
+    HALF_SUB_SCREEN = 0x04
+    DOUBLE_SUB_SCREEN = 0x08
+    ADD_SUB_SCREEN = 0x10
+    SUB_SUB_SCREEN = 0x20
+    FADE_ENABLE = 0x40
+    CMATH_ENABLE = 0x80
+
+    _fields = ("fade", "flags")
+
+    def bind(self, flush: bool = True) -> None:
+        _count("CMathState.bind")
+        _state.cmath = self
+
+    def unbind(self) -> None:
+        if _state.cmath is self:
+            _state.cmath = CMathState()
+
+    def get_bind_point(self) -> bool:
+        return _state.cmath is self
+
+
+class OAM:
+    def __init__(self):
+        self._sprites = [Sprite() for _ in range(SPRITE_COUNT)]
+
+    def __getitem__(self, index: int) -> Sprite:
+        return self._sprites[index]
+
+    def __setitem__(self, index: int, value: Sprite) -> None:
+        _count("oam[]")
+        self._sprites[index] = value
+
+    def __len__(self) -> int:
+        return SPRITE_COUNT
+
+
+class MAP:
+    def __init__(self, name: str):
+        self._name = name
+        self.entries = np.zeros(MAP_WIDTH * MAP_HEIGHT, dtype=np.uint16)
+
+    def __getitem__(self, index: int) -> int:
+        return int(self.entries[index])
+
+    def __setitem__(self, index: int, value: int) -> None:
+        _count(self._name)
+        self.entries[index] = value
+
+    def __len__(self) -> int:
+        return MAP_WIDTH * MAP_HEIGHT
+
+
+class HDMA:
+    def __init__(self):
+        self._lines = [None] * HDMA_LINES
+
+    def __getitem__(self, index: int):
+        return self._lines[index]
+
+    def __setitem__(self, index: int, value) -> None:
+        _count("hdma[]")
+        self._lines[index] = value
+
+    def __len__(self) -> int:
+        return HDMA_LINES
+
+
+class _State:
+    def __init__(self):
+        self.main = MainState()
+        self.cmath = CMathState()
+        self.backgrounds = [Background(), Background()]
+
+
+_state = _State()
+oam = OAM()
+bg0 = MAP("bg0[]")
+bg1 = MAP("bg1[]")
+hdma_0 = HDMA()
+hdma_1 = HDMA()
+hdma_2 = HDMA()
+hdma_3 = HDMA()
+hdma_4 = HDMA()
+hdma_5 = HDMA()
+hdma_6 = HDMA()
+hdma_7 = HDMA()
+hdma_enable = 0
+
+sprite_graphics = np.zeros((GRAPHICS_HEIGHT, GRAPHICS_WIDTH), dtype=np.uint16)
+background_graphics = np.zeros((GRAPHICS_HEIGHT, GRAPHICS_WIDTH), dtype=np.uint16)
+
+
+@_native
+def gfx_reset() -> None:
+    global oam, hdma_enable
+    sprite_graphics[:] = 0
+    background_graphics[:] = 0
+    bg0.entries[:] = 0
+    bg1.entries[:] = 0
+    for table in _hdma_tables():
+        table._lines = [None] * HDMA_LINES
+    hdma_enable = 0
+    oam = OAM()
+    _state.__init__()
+
+
+# graphics memory primitives
+
+
+def _place(memory, x, y, pixels, double_size, transparent) -> int:
+    if double_size:
+        pixels = pixels.repeat(2, axis=0).repeat(2, axis=1)
+    height, width = pixels.shape
+    if x < 0 or x + width > GRAPHICS_WIDTH:
+        return ImageCode.TooWide
+    if y < 0 or y + height > GRAPHICS_HEIGHT:
+        return ImageCode.TooTall
+    target = memory[y : y + height, x : x + width]
+    if transparent:
+        mask = pixels != 0
+        target[mask] = pixels[mask]
+    else:
+        target[:] = pixels
+    return ImageCode.Success
+
+
+def _raw(width, height, data) -> np.ndarray:
+    pixels = np.frombuffer(bytes(data), dtype="<u2", count=width * height)
+    return pixels.reshape(height, width).astype(np.uint16)
+
+
+def _palette(palette) -> np.ndarray:
+    return np.frombuffer(bytes(palette), dtype="<u2").astype(np.uint16)
+
+
+def _unpack(width, height, bitdepth, data) -> np.ndarray:
+    """Packed palette indices, lowest bits first, rows padded to whole bytes."""
+    bits = _BITS[bitdepth]
+    raw = np.frombuffer(bytes(data), dtype=np.uint8)
+    if bits == 8:
+        return raw[: width * height].reshape(height, width)
+    per_byte = 8 // bits
+    row_bytes = -(-width // per_byte)
+    rows = raw[: row_bytes * height].reshape(height, row_bytes)
+    shifts = np.arange(per_byte, dtype=np.uint8) * bits
+    indices = (rows[:, :, None] >> shifts) & ((1 << bits) - 1)
+    return indices.reshape(height, row_bytes * per_byte)[:, :width]
+
+
+def _decompress(width, height, data) -> np.ndarray:
+    """(run length - 1, index) byte pairs, as written by encode_image.py."""
+    pairs = np.frombuffer(bytes(data), dtype=np.uint8)
+    runs = pairs[0::2].astype(np.int64) + 1
+    indices = np.repeat(pairs[1::2], runs)
+    return indices[: width * height].reshape(height, width)
+
+
+def _paletted(width, height, palette, bitdepth, data) -> np.ndarray:
+    return _palette(palette)[_unpack(width, height, bitdepth, data)]
+
+
+def _compressed(width, height, palette, bitdepth, data) -> np.ndarray:
+    return _palette(palette)[_decompress(width, height, data)]
+
+
+def _copy(memory, dst_x, dst_y, width, height, src_x, src_y, double, transparent):
+    pixels = memory[src_y : src_y + height, src_x : src_x + width].copy()
+    return _place(memory, dst_x, dst_y, pixels, double, transparent)
+
+
+def _fill(memory, x, y, width, height, colour) -> int:
+    pixels = np.full((height, width), colour, dtype=np.uint16)
+    return _place(memory, x, y, pixels, False, False)
+
+
+GLYPH_WIDTH = 6
+GLYPH_HEIGHT = 8
+
+
+def _layout(line_width, text, double_size, newline_height, line_start=0):
+    """Glyph positions for text wrapped at line_width, and where it ends."""
+    scale = 2 if double_size else 1
+    advance = GLYPH_WIDTH * scale
+    x = line_start
+    y = 0
+    cells = []
+    for char in text:
+        if char == "\n" or x + advance > line_width:
+            x = 0
+            y += newline_height * scale
+            if char == "\n":
+                continue
+        if char != " ":
+            cells.append((x, y))
+        x += advance
+    return cells, x, y
+
+
+def _text(memory, x, y, colour, line_width, text, double, newline, line_start=0):
+    scale = 2 if double else 1
+    cells, end_x, end_y = _layout(line_width, text, double, newline, line_start)
+    w = (GLYPH_WIDTH - 1) * scale
+    h = (GLYPH_HEIGHT - 1) * scale
+    for cx, cy in cells:
+        memory[y + cy : y + cy + h, x + cx : x + cx + w] = colour
+    return ImageCode.Success, x + end_x, y + end_y
+
+
+@_native
+def get_text_size(line_width, text, double_size=False, newline_height=10):
+    scale = 2 if double_size else 1
+    cells, end_x, end_y = _layout(line_width, text, double_size, newline_height)
+    width = max([cx for cx, _ in cells] + [0]) + GLYPH_WIDTH * scale
+    return min(width, line_width), end_y + newline_height * scale
+
+
+@_native
+def copy_sprite(dst_x, dst_y, width, height, src_x, src_y, double_size=False):
+    return _copy(
+        sprite_graphics, dst_x, dst_y, width, height, src_x, src_y, double_size, False
+    )
+
+
+@_native
+def copy_sprite_transparent(
+    dst_x, dst_y, width, height, src_x, src_y, double_size=False
+):
+    return _copy(
+        sprite_graphics, dst_x, dst_y, width, height, src_x, src_y, double_size, True
+    )
+
+
+@_native
+def fill_sprite(x, y, width, height, colour):
+    return _fill(sprite_graphics, x, y, width, height, colour)
+
+
+@_native
+def draw_text_sprite(
+    x, y, colour, line_width, text, double_size=False, newline_height=10
+):
+    return _text(
+        sprite_graphics, x, y, colour, line_width, text, double_size, newline_height
+    )[0]
+
+
+@_native
+def draw_text_next_sprite(
+    x, y, colour, line_start, line_width, text, double_size=False, newline_height=10
+):
+    return _text(
+        sprite_graphics,
+        x,
+        y,
+        colour,
+        line_width,
+        text,
+        double_size,
+        newline_height,
+        line_start,
+    )
+
+
+@_native
+def blit_sprite(x, y, width, height, data, double_size=False):
+    pixels = _raw(width, height, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def blit_sprite_transparent(x, y, width, height, data, double_size=False):
+    pixels = _raw(width, height, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, True)
+
+
+@_native
+def paletted_sprite(x, y, width, height, palette, bitdepth, data, double_size=False):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _paletted(width, height, palette, bitdepth, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def paletted_sprite_transparent(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _paletted(width, height, palette, bitdepth, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, True)
+
+
+@_native
+def compressed_sprite(x, y, width, height, palette, bitdepth, data, double_size=False):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _compressed(width, height, palette, bitdepth, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def compressed_sprite_transparent(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _compressed(width, height, palette, bitdepth, data)
+    return _place(sprite_graphics, x, y, pixels, double_size, True)
+
+
+@_native
+def copy_background(dst_x, dst_y, width, height, src_x, src_y, double_size=False):
+    return _copy(
+        background_graphics,
+        dst_x,
+        dst_y,
+        width,
+        height,
+        src_x,
+        src_y,
+        double_size,
+        False,
+    )
+
+
+@_native
+def copy_background_transparent(
+    dst_x, dst_y, width, height, src_x, src_y, double_size=False
+):
+    return _copy(
+        background_graphics,
+        dst_x,
+        dst_y,
+        width,
+        height,
+        src_x,
+        src_y,
+        double_size,
+        True,
+    )
+
+
+@_native
+def fill_background(x, y, width, height, colour):
+    return _fill(background_graphics, x, y, width, height, colour)
+
+
+@_native
+def draw_text_background(
+    x, y, colour, line_width, text, double_size=False, newline_height=10
+):
+    return _text(
+        background_graphics,
+        x,
+        y,
+        colour,
+        line_width,
+        text,
+        double_size,
+        newline_height,
+    )[0]
+
+
+@_native
+def draw_text_next_background(
+    x, y, colour, line_start, line_width, text, double_size=False, newline_height=10
+):
+    return _text(
+        background_graphics,
+        x,
+        y,
+        colour,
+        line_width,
+        text,
+        double_size,
+        newline_height,
+        line_start,
+    )
+
+
+@_native
+def blit_background(x, y, width, height, data, double_size=False):
+    pixels = _raw(width, height, data)
+    return _place(background_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def blit_background_transparent(x, y, width, height, data, double_size=False):
+    pixels = _raw(width, height, data)
+    return _place(background_graphics, x, y, pixels, double_size, True)
+
+
+@_native
+def paletted_background(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _paletted(width, height, palette, bitdepth, data)
+    return _place(background_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def paletted_background_transparent(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _paletted(width, height, palette, bitdepth, data)
+    return _place(background_graphics, x, y, pixels, double_size, True)
+
+
+@_native
+def compressed_background(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _compressed(width, height, palette, bitdepth, data)
+    return _place(background_graphics, x, y, pixels, double_size, False)
+
+
+@_native
+def compressed_background_transparent(
+    x, y, width, height, palette, bitdepth, data, double_size=False
+):
+    if bitdepth not in _BITS:
+        return ImageCode.InvalidBitdepth
+    pixels = _compressed(width, height, palette, bitdepth, data)
+    return _place(background_graphics, x, y, pixels, double_size, True)
+
+
+# rendering
+
+
+def _hdma_tables() -> tuple:
+    return (hdma_0, hdma_1, hdma_2, hdma_3, hdma_4, hdma_5, hdma_6, hdma_7)
+
+
+def _regions(main: MainState, width: int) -> np.ndarray:
+    """Window region bit (WINDOW_A/B/AB/X) of each screen column."""
+    columns = np.arange(width)
+    in_1 = (columns >= main.window_1_left) & (columns <= main.window_1_right)
+    in_2 = (columns >= main.window_2_left) & (columns <= main.window_2_right)
+    return np.select(
+        [in_1 & in_2, in_1, in_2], [WINDOW_AB, WINDOW_A, WINDOW_B], WINDOW_X
+    ).astype(np.uint8)
+
+
+def _draw_background(screen, sub, regions, layer, background, y0, y1) -> None:
+    height = y1 - y0
+    px_w = MAP_WIDTH * TILE_SIZE
+    px_h = MAP_HEIGHT * TILE_SIZE
+    ys = (np.arange(y0, y1)[:, None] + background.y) % px_h
+    xs = (np.arange(SCREEN_WIDTH)[None, :] + background.x) % px_w
+    entries = layer.entries[
+        ((ys // TILE_SIZE) << MAP_WIDTH_POWER) | (xs // TILE_SIZE)
+    ].astype(np.int64)
+    index = entries >> MAP_INDEX_SHIFT
+    in_x = xs % TILE_SIZE
+    in_y = ys % TILE_SIZE
+    in_x = np.where(entries & MAP_FLIP_X, TILE_SIZE - 1 - in_x, in_x)
+    in_y = np.where(entries & MAP_FLIP_Y, TILE_SIZE - 1 - in_y, in_y)
+    gx = (index % TILES_PER_ROW) * TILE_SIZE + in_x
+    gy = ((index // TILES_PER_ROW) * TILE_SIZE + in_y) % GRAPHICS_HEIGHT
+    pixels = background_graphics[gy, gx]
+    _composite(screen, sub, regions, pixels, background.windows, height)
+
+
+def _draw_sprite(screen, sub, regions, sprite, y0, y1) -> None:
+    scale = 2 if sprite.flags & DOUBLE else 1
+    width = sprite.width
+    height = sprite.height
+    top = max(sprite.y, y0)
+    bottom = min(sprite.y + height * scale, y1)
+    left = max(sprite.x, 0)
+    right = min(sprite.x + width * scale, SCREEN_WIDTH)
+    if top >= bottom or left >= right:
+        return
+    src_y = (np.arange(top, bottom) - sprite.y) // scale
+    src_x = (np.arange(left, right) - sprite.x) // scale
+    if sprite.flags & FLIP_Y:
+        src_y = height - 1 - src_y
+    if sprite.flags & FLIP_X:
+        src_x = width - 1 - src_x
+    gy = (sprite.graphics_y + src_y) % GRAPHICS_HEIGHT
+    gx = (sprite.graphics_x + src_x) % GRAPHICS_WIDTH
+    pixels = sprite_graphics[gy[:, None], gx[None, :]]
+    if sprite.flags & C_MATH:
+        pixels = np.where(pixels != 0, pixels | CMATH_BIT, 0).astype(np.uint16)
+    rows = slice(top - y0, bottom - y0)
+    columns = slice(left, right)
+    _composite(
+        screen[rows, columns],
+        sub[rows, columns],
+        regions[columns],
+        pixels,
+        sprite.windows,
+        bottom - top,
+    )
+
+
+def _composite(screen, sub, regions, pixels, windows, height) -> None:
+    """Draw a layer's opaque pixels onto the main and sub screens wherever its
+    window bits allow."""
+    opaque = pixels != 0
+    main_mask = opaque & ((regions & windows) != 0)[None, :]
+    sub_mask = opaque & ((regions & (windows >> 4)) != 0)[None, :]
+    screen[main_mask] = pixels[main_mask]
+    sub[sub_mask] = pixels[sub_mask]
+
+
+def _colour_math(screen, sub, cmath: CMathState, enabled: bool) -> np.ndarray:
+    out = screen.astype(np.int32)
+    channels = [(out >> 10) & 31, (out >> 5) & 31, out & 31]
+    if enabled and cmath.flags & CMathState.CMATH_ENABLE:
+        sub32 = sub.astype(np.int32)
+        sub_channels = [(sub32 >> 10) & 31, (sub32 >> 5) & 31, sub32 & 31]
+        math = (out & CMATH_BIT) != 0
+        flags = cmath.flags
+        for i in range(3):
+            main_c = channels[i]
+            sub_c = sub_channels[i]
+            if flags & CMathState.HALF_MAIN_SCREEN:
+                main_c = main_c >> 1
+            if flags & CMathState.DOUBLE_MAIN_SCREEN:
+                main_c = main_c << 1
+            if flags & CMathState.HALF_SUB_SCREEN:
+                sub_c = sub_c >> 1
+            if flags & CMathState.DOUBLE_SUB_SCREEN:
+                sub_c = sub_c << 1
+            if flags & CMathState.ADD_SUB_SCREEN:
+                mixed = main_c + sub_c
+            elif flags & CMathState.SUB_SUB_SCREEN:
+                mixed = main_c - sub_c
+            else:
+                mixed = main_c
+            channels[i] = np.where(math, np.clip(mixed, 0, 31), channels[i])
+    if cmath.flags & CMathState.FADE_ENABLE:
+        # fade is how far towards black, 0 leaving the picture as it is
+        fade = cmath.fade & 0xFF
+        channels = [c - ((c * fade) >> 8) for c in channels]
+    return ((channels[0] << 10) | (channels[1] << 5) | channels[2]).astype(np.uint16)
+
+
+def _render_band(screen, y0, y1, main, cmath, backgrounds, sprites) -> None:
+    height = y1 - y0
+    regions = _regions(main, SCREEN_WIDTH)
+    band = np.zeros((height, SCREEN_WIDTH), dtype=np.uint16)
+    sub = np.full((height, SCREEN_WIDTH), main.subscreen_colour, dtype=np.uint16)
+    # backdrop
+    backdrop = np.full((height, SCREEN_WIDTH), main.mainscreen_colour, np.uint16)
+    if main.flags & MainState.BGCOL_WINDOW_ENABLE:
+        main_mask = np.broadcast_to(
+            ((regions & main.bgcol_windows) != 0)[None, :], band.shape
+        )
+        band[main_mask] = backdrop[main_mask]
+    else:
+        band[:] = backdrop
+    if main.flags & MainState.BG1_ENABLE:
+        _draw_background(band, sub, regions, bg1, backgrounds[1], y0, y1)
+    if main.flags & MainState.BG0_ENABLE:
+        _draw_background(band, sub, regions, bg0, backgrounds[0], y0, y1)
+    if main.flags & (MainState.SPR0_ENABLE | MainState.SPR1_ENABLE):
+        # lower slots end up on top; PRIORITY sprites above the rest
+        for priority in (0, PRIORITY):
+            for sprite in reversed(sprites):
+                flags = sprite.flags
+                if flags & ENABLED and flags & PRIORITY == priority:
+                    _draw_sprite(band, sub, regions, sprite, y0, y1)
+    screen[y0:y1] = _colour_math(
+        band, sub, cmath, bool(main.flags & MainState.CMATH_ENABLE)
+    )
+
+
+def render() -> np.ndarray:
+    """Composite the current state into a (240, 240) array of BGR555 pixels."""
+    _count("render")
+    screen = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH), dtype=np.uint16)
+    sprites = list(oam._sprites)
+    if not hdma_enable:
+        _render_band(
+            screen,
+            0,
+            SCREEN_HEIGHT,
+            _state.main,
+            _state.cmath,
+            _state.backgrounds,
+            sprites,
+        )
+        return screen
+    # with HDMA, registers can change at the start of any line: render line by
+    # line from a copy of the state, applying each enabled table as we go
+    main = MainState()
+    main._copy_from(_state.main)
+    cmath = CMathState()
+    cmath._copy_from(_state.cmath)
+    backgrounds = []
+    for background in _state.backgrounds:
+        copy = Background()
+        copy._copy_from(background)
+        backgrounds.append(copy)
+    tables = [t for i, t in enumerate(_hdma_tables()) if hdma_enable & (1 << i)]
+    for line in range(SCREEN_HEIGHT):
+        for table in tables:
+            entry = table._lines[line]
+            if isinstance(entry, MainState):
+                main._copy_from(entry)
+            elif isinstance(entry, CMathState):
+                cmath._copy_from(entry)
+            elif isinstance(entry, tuple):
+                index, value = entry
+                if isinstance(value, Background):
+                    backgrounds[index]._copy_from(value)
+                else:
+                    sprite = Sprite()
+                    sprite._copy_from(value)
+                    sprites[index] = sprite
+        _render_band(screen, line, line + 1, main, cmath, backgrounds, sprites)
+    return screen
+
+
+def to_rgb888(frame: np.ndarray) -> np.ndarray:
+    """BGR555 frame -> (h, w, 3) uint8 RGB, for saving or display."""
+    c = frame.astype(np.uint16)
+    rgb = np.stack(((c >> 10) & 31, (c >> 5) & 31, c & 31), axis=-1).astype(np.uint8)
+    return (rgb << 3) | (rgb >> 2)
@@ -0,0 +1,27 @@
+"""Stand-in for the firmware's event bus. emit() calls handlers immediately."""
+
+
+class EventBus:
+    def __init__(self):
+        self._handlers: dict[type, list] = {}
+
+    def on(self, event_type, handler, app) -> None:
+        self._handlers.setdefault(event_type, []).append((handler, app))
+
+    def on_async(self, event_type, handler, app) -> None:
+        self.on(event_type, handler, app)
+
+    def remove(self, event_type, handler, app) -> None:
+        handlers = self._handlers.get(event_type, [])
+        if (handler, app) in handlers:
+            handlers.remove((handler, app))
+
+    def emit(self, event) -> None:
+        for handler, _ in list(self._handlers.get(type(event), ())):
+            handler(event)
+
+    async def emit_async(self, event) -> None:
+        self.emit(event)
+
+
+eventbus = EventBus()
@@ -0,0 +1,3 @@
+class RequestStopAppEvent:
+    def __init__(self, app):
+        self.app = app
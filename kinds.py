@@ -0,0 +1,23 @@
+from .constants import SPRITE_WIDTH, SPRITE_HEIGHT
+
+# world object types
+KIND_NONE = 0
+KIND_TREE = 1
+KIND_CAVE = 2
+KIND_POO = 3
+KIND_COUNT = 4
+
+# per kind: (graphics_x, graphics_y) on the sprite sheet
+GRAPHICS: tuple[tuple[int, int], ...] = (
+    (0, 0),
+    (SPRITE_WIDTH * 2, 0),
+    (SPRITE_WIDTH * 3, 0),
+    (0, SPRITE_HEIGHT * 1),
+)
+# per kind: sprite size
+WIDTH: tuple[int, ...] = (SPRITE_WIDTH,) * KIND_COUNT
+HEIGHT: tuple[int, ...] = (SPRITE_HEIGHT,) * KIND_COUNT
+# per kind: static scenery (can go into the tilemap)
+STATIC: tuple[bool, ...] = (False, True, True, False)
+# per kind: blocks the player
+SOLID: tuple[bool, ...] = (False, True, True, False)
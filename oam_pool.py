@@ -0,0 +1,71 @@
+from array import array
+
+import sasppu
+
+
+class OAMPool:
+    """
+    Fixed-size allocator for OAM slots.
+
+    Free slots are kept on a stack and live slots in a dense array, with each
+    slot's position in that array remembered, so acquire() and release() are
+    O(1) and nothing is allocated after construction.
+    """
+
+    count: int
+    used: int
+    peak: int
+
+    def __init__(self, count: int = sasppu.SPRITE_COUNT):
+        self.count = count
+        # free stack, lowest slot on top so slots are handed out in order
+        self._free = array("H", range(count - 1, -1, -1))
+        self._free_top = count
+        # live slots, packed at the front, and each slot's index in there
+        self._live = array("H", bytes(2 * count))
+        self._live_index = array("H", bytes(2 * count))
+        self._in_use = bytearray(count)
+        self.used = 0
+        self.peak = 0
+
+    @property
+    def available(self) -> int:
+        """Number of slots that can still be acquired."""
+        return self._free_top
+
+    def acquire(self) -> int:
+        """Take a free OAM slot."""
+        if not self._free_top:
+            raise ValueError("No free OAM slots available")
+        self._free_top -= 1
+        slot = self._free[self._free_top]
+        self._in_use[slot] = 1
+        self._live[self.used] = slot
+        self._live_index[slot] = self.used
+        self.used += 1
+        if self.used > self.peak:
+            self.peak = self.used
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Give a slot back to the pool. The caller is responsible for hiding it."""
+        if not self._in_use[slot]:
+            raise ValueError(f"OAM slot {slot} is not in use")
+        self._in_use[slot] = 0
+        # swap the last live slot into the hole
+        self.used -= 1
+        index = self._live_index[slot]
+        last = self._live[self.used]
+        self._live[index] = last
+        self._live_index[last] = index
+        self._free[self._free_top] = slot
+        self._free_top += 1
+
+    def in_use(self, slot: int) -> bool:
+        """Whether a slot is currently acquired."""
+        return bool(self._in_use[slot])
+
+    def live(self) -> memoryview:
+        """View of the slots currently in use, in no particular order.
+        Not a copy: it is only valid until the next acquire/release."""
+        return memoryview(self._live)[: self.used]
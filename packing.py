@@ -0,0 +1,14 @@
+from array import array
+
+
+def zeros(typecode: str, itemsize: int, n: int) -> array:
+    """A zero-filled array of n items, built from a bytes object rather than
+    a list of ints."""
+    return array(typecode, bytes(itemsize * n))
+
+
+def pack_key(x: int, y: int) -> int:
+    """Pack a grid coordinate (tile, cell or chunk) into a small int dict key,
+    so lookups do not allocate a tuple. Each axis keeps 15 bits, so negative
+    coordinates wrap instead of colliding with nearby positive ones."""
+    return ((y & 0x7FFF) << 15) | (x & 0x7FFF)
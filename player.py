@@ -1,57 +1,115 @@
-from sasppu import Sprite
+from array import array
 
-from .direction import Direction, DirectionTuple
-from .constants import SPRITE_WIDTH
+import sasppu
+
+from .direction import Direction, DirectionTuple, FACING_COUNT
+from .constants import SPRITE_WIDTH, TRACE_LEVEL
+from .shadow_oam import ShadowOAM
+from .animation import Animation
+from .trace import trace, TRACE_DEBUG, EV_FACING
 
 GraphicsOffset = int
 
+# pixels moved per Player.move call
+PLAYER_SPEED = 2
+
+directional_sprites: dict[Direction, GraphicsOffset] = {
+    DirectionTuple.N: 0,
+    DirectionTuple.S: 0,
+    DirectionTuple.E: SPRITE_WIDTH,
+    DirectionTuple.W: SPRITE_WIDTH,
+    DirectionTuple.NE: SPRITE_WIDTH,
+    DirectionTuple.NW: SPRITE_WIDTH,
+    DirectionTuple.SE: SPRITE_WIDTH,
+    DirectionTuple.SW: SPRITE_WIDTH,
+}
+
+
+def _facing_flags(direction: Direction) -> int:
+    """Sprite flags for a facing: mirror for west, flip for due south."""
+    parts = DirectionTuple.parts(direction)
+    if DirectionTuple.W in parts:
+        return sasppu.FLIP_X
+    if DirectionTuple.S in parts and not (
+        DirectionTuple.E in parts or DirectionTuple.W in parts
+    ):
+        return sasppu.FLIP_Y
+    return 0
+
+
+def _build_walk_animation() -> Animation:
+    """Walk cycle per facing. The sheet has one image per facing so far; add
+    frames here (and raise frame_count) when there is more art."""
+    walk = Animation(frame_count=1, ticks_per_frame=8)
+    for direction, graphics_x in directional_sprites.items():
+        walk.set_frame(
+            DirectionTuple.index(direction),
+            0,
+            graphics_x,
+            0,
+            _facing_flags(direction),
+        )
+    return walk
+
+
+# built once at import: per facing, the step in x/y for one move
+MOVE_DX = array("b", bytes(FACING_COUNT))
+MOVE_DY = array("b", bytes(FACING_COUNT))
+for _direction in directional_sprites:
+    MOVE_DX[DirectionTuple.index(_direction)] = _direction[0] * PLAYER_SPEED
+    MOVE_DY[DirectionTuple.index(_direction)] = _direction[1] * PLAYER_SPEED
+WALK_ANIMATION = _build_walk_animation()
+
 
 class Player:
     x: int
     y: int
     facing: Direction
     graphics_x: int
-    sprite_offset: int
-    sprite: Sprite
-
-    directional_sprites: dict[Direction, GraphicsOffset] = {
-        DirectionTuple.N: 0,
-        DirectionTuple.S: 0,
-        DirectionTuple.E: SPRITE_WIDTH,
-        DirectionTuple.W: SPRITE_WIDTH,
-        DirectionTuple.NE: SPRITE_WIDTH,
-        DirectionTuple.NW: SPRITE_WIDTH,
-        DirectionTuple.SE: SPRITE_WIDTH,
-        DirectionTuple.SW: SPRITE_WIDTH,
-    }
-
-    def __init__(self, with_sprite: Sprite, graphics_x: int, x: int = 0, y: int = 0):
-        self.sprite = with_sprite
+    graphics_y: int
+    oam: ShadowOAM
+    slot: int
+    animation: Animation
+    tick: int
+
+    directional_sprites = directional_sprites
+
+    def __init__(
+        self, oam: ShadowOAM, slot: int, graphics_x: int, x: int = 0, y: int = 0
+    ):
+        self.oam = oam
+        self.slot = slot
         self.graphics_x = graphics_x
-        self.sprite.graphics_x = self.graphics_x
+        self.graphics_y = oam.graphics_y[slot]
+        oam.set_graphics(slot, self.graphics_x, self.graphics_y)
         self.x = x
         self.y = y
         self.facing = DirectionTuple.N
-        self.sprite_offset = 0
-
-    def __calculate_offset(self):
-        """Calculate the sprite offset based on the current facing direction."""
-        self.sprite_offset = self.directional_sprites[self.facing]
-        self.sprite.graphics_x = self.graphics_x + self.sprite_offset
-
-    def __calculate_flags(self):
-        print(f"Facing {DirectionTuple.to_string(self.facing)}")
-        flags: list[int] = [self.sprite.ENABLED]
-
-        parts = DirectionTuple.parts(self.facing)
-        if DirectionTuple.W in parts:
-            flags.append(self.sprite.FLIP_X)
-        elif DirectionTuple.S in parts and not (
-            DirectionTuple.E in parts or DirectionTuple.W in parts
-        ):
-            flags.append(self.sprite.FLIP_Y)
-
-        self.sprite.flags = sum(flags)
+        self.animation = WALK_ANIMATION
+        # the World, once World.set_player is called; moves into solid objects
+        # are refused
+        self.world = None
+        # animation tick, and the table entry currently shown (-1: none yet)
+        self.tick = 0
+        self._entry = -1
+
+    def assign_slot(self, slot: int) -> None:
+        """Move the player sprite to another OAM slot (for draw ordering),
+        writing its whole state there."""
+        oam = self.oam
+        old = self.slot
+        oam.init(
+            slot,
+            x=oam.x[old],
+            y=oam.y[old],
+            width=oam.width[old],
+            height=oam.height[old],
+            graphics_x=oam.graphics_x[old],
+            graphics_y=oam.graphics_y[old],
+            windows=oam.windows[old],
+            flags=oam.flags[old],
+        )
+        self.slot = slot
 
     @property
     def world_x(self) -> int:
@@ -63,16 +121,57 @@ class Player:
         """World Y coordinate of the player."""
         return self.y
 
+    def _show(self, facing: int) -> None:
+        """Show the animation entry for a facing (by index) at the current tick."""
+        animation = self.animation
+        entry = animation.entry(facing, self.tick)
+        if entry != self._entry:
+            self._entry = entry
+            self.oam.set_graphics(
+                self.slot,
+                self.graphics_x + animation.graphics_x[entry],
+                self.graphics_y + animation.graphics_y[entry],
+            )
+            self.oam.set_flags(self.slot, animation.flags[entry] | sasppu.ENABLED)
+
+    def restore(self, x: int, y: int, facing: Direction, tick: int) -> None:
+        """Put the player back where a snapshot left it."""
+        self.x = x
+        self.y = y
+        self.facing = facing
+        self.tick = tick
+        self._show(DirectionTuple.index(facing))
+
     def move(self, direction: Direction):
         """Moves the player in the specified DirectionTuple.
-        Either move_x or move_y must be non-zero.
-        Only one of them can be non-zero at a time."""
 
-        self.facing = direction
-
-        self.__calculate_offset()
-        self.__calculate_flags()
+        Facing, flags and step all come from tables built at import, and the
+        sprite is only touched when the animation entry actually changes."""
 
-        self.x += direction[0] * 2
-        self.y += direction[1] * 2
+        facing = DirectionTuple.index(direction)
+        if TRACE_LEVEL >= TRACE_DEBUG and direction != self.facing:
+            trace(EV_FACING, facing)
+        self.facing = direction
+        self.tick += 1
+        self._show(facing)
+
+        dx = MOVE_DX[facing]
+        dy = MOVE_DY[facing]
+        world = self.world
+        if world is not None:
+            # the sprite is centred on (x, y); resolve each axis on its own so
+            # the player slides along obstacles instead of sticking to them
+            width = self.oam.width[self.slot]
+            height = self.oam.height[self.slot]
+            left = self.x - width // 2
+            top = self.y - height // 2
+            # a box already overlapping something solid (e.g. the player
+            # started on a tree) may always move, so it can get out again
+            if not world.blocked(left, top, width, height):
+                if dx and world.blocked(left + dx, top, width, height):
+                    dx = 0
+                if dy and world.blocked(left + dx, top + dy, width, height):
+                    dy = 0
+        self.x += dx
+        self.y += dy
         # Positioning of sprite is handled by World; removed direct sprite.x/y assignments
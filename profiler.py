@@ -0,0 +1,191 @@
+from array import array
+
+import sasppu
+import time
+
+from .shadow_oam import ShadowOAM
+from .oam_pool import OAMPool
+
+# phases of a frame, in the order SASPPUTest.run goes through them
+PHASE_INPUT = 0
+PHASE_MOVE = 1
+PHASE_WORLD = 2
+PHASE_OAM = 3
+PHASE_RENDER = 4
+# whole frame, from begin_frame to end_frame
+PHASE_FRAME = 5
+PHASE_COUNT = 6
+
+PHASE_NAMES = ("input", "move", "world", "oam", "render", "frame")
+
+
+class FrameProfiler:
+    """
+    Times the phases of each frame in microseconds.
+
+    Samples go into a ring buffer of the last `frames` frames, allocated up
+    front, so profiling a frame allocates nothing:
+
+        profiler.begin_frame()
+        ...                             # decode input
+        profiler.mark(PHASE_INPUT)      # time since the previous mark
+        ...
+        profiler.end_frame()
+    """
+
+    frames: int
+    # frames * PHASE_COUNT microsecond samples, one row per frame
+    samples: array
+    # total frames profiled, including those overwritten since
+    count: int
+
+    def __init__(self, frames: int = 64):
+        self.frames = frames
+        self.samples = array("I", bytes(4 * frames * PHASE_COUNT))
+        self.count = 0
+        self._row = 0
+        self._start = 0
+        self._mark = 0
+
+    def begin_frame(self) -> None:
+        self._row = (self.count % self.frames) * PHASE_COUNT
+        samples = self.samples
+        for i in range(self._row, self._row + PHASE_COUNT):
+            samples[i] = 0
+        self._start = self._mark = time.ticks_us()
+
+    def mark(self, phase: int) -> None:
+        """Add the time since the last mark (or begin_frame) to a phase."""
+        now = time.ticks_us()
+        self.samples[self._row + phase] += time.ticks_diff(now, self._mark)
+        self._mark = now
+
+    def end_frame(self) -> None:
+        now = time.ticks_us()
+        self.samples[self._row + PHASE_FRAME] = time.ticks_diff(now, self._start)
+        self.count += 1
+
+    def mean(self, phase: int) -> int:
+        """Mean of a phase over the frames in the buffer, without allocating."""
+        n = min(self.count, self.frames)
+        if not n:
+            return 0
+        samples = self.samples
+        total = 0
+        for i in range(n):
+            total += samples[i * PHASE_COUNT + phase]
+        return total // n
+
+    def stats(self, phase: int) -> tuple[int, int, int, int]:
+        """(min, mean, p95, max) of a phase over the frames in the buffer.
+        Sorts a copy of the column, so it is meant for dump(), not per frame."""
+        n = min(self.count, self.frames)
+        if not n:
+            return 0, 0, 0, 0
+        samples = self.samples
+        ordered = sorted(samples[i * PHASE_COUNT + phase] for i in range(n))
+        p95 = ordered[(95 * n + 99) // 100 - 1]
+        return ordered[0], sum(ordered) // n, p95, ordered[-1]
+
+    def rows(self):
+        """Iterate over the buffered frames, oldest first, as memoryview rows."""
+        n = min(self.count, self.frames)
+        first = self.count - n
+        view = memoryview(self.samples)
+        for frame in range(first, self.count):
+            row = (frame % self.frames) * PHASE_COUNT
+            yield view[row : row + PHASE_COUNT]
+
+    def dump(self, path: str | None = None) -> None:
+        """Write the buffer as CSV (one line per frame, microseconds) followed by
+        a summary, to a file or to the console, for comparing builds."""
+        lines = [",".join(PHASE_NAMES)]
+        for row in self.rows():
+            lines.append(",".join(str(value) for value in row))
+        for phase in range(PHASE_COUNT):
+            low, mean, p95, high = self.stats(phase)
+            lines.append(
+                f"# {PHASE_NAMES[phase]} min={low} mean={mean} p95={p95} max={high}"
+            )
+        if path is None:
+            for line in lines:
+                print(line)
+            return
+        with open(path, "w") as f:
+            for line in lines:
+                f.write(line)
+                f.write("\n")
+
+
+class ProfilerHUD:
+    """
+    On-screen frame timings: text is drawn into a spare area of sprite graphics
+    memory and shown with one OAM slot. The text is only redrawn when the
+    numbers (in tenths of a millisecond) change.
+    """
+
+    def __init__(
+        self,
+        profiler: FrameProfiler,
+        oam: ShadowOAM,
+        pool: OAMPool,
+        graphics_x: int,
+        graphics_y: int,
+        width: int = 128,
+        height: int = 64,
+        interval: int = 16,
+    ):
+        self.profiler = profiler
+        self.oam = oam
+        self.graphics_x = graphics_x
+        self.graphics_y = graphics_y
+        self.width = width
+        self.height = height
+        self.interval = interval
+        self._shown = array("H", bytes(2 * PHASE_COUNT))
+        self._values = array("H", bytes(2 * PHASE_COUNT))
+        self._drawn = False
+        self.slot = pool.acquire()
+        oam.init(
+            self.slot,
+            x=0,
+            y=0,
+            width=width,
+            height=height,
+            graphics_x=graphics_x,
+            graphics_y=graphics_y,
+            windows=sasppu.WINDOW_ALL,
+            flags=sasppu.ENABLED | sasppu.PRIORITY,
+        )
+
+    def update(self) -> None:
+        """Refresh the overlay every `interval` frames, if anything changed."""
+        profiler = self.profiler
+        if profiler.count % self.interval:
+            return
+        values = self._values
+        changed = not self._drawn
+        for phase in range(PHASE_COUNT):
+            mean = profiler.mean(phase) // 100
+            values[phase] = min(mean, 0xFFFF)
+            if values[phase] != self._shown[phase]:
+                changed = True
+        if not changed:
+            return
+        for phase in range(PHASE_COUNT):
+            self._shown[phase] = values[phase]
+        self._drawn = True
+        text = "\n".join(
+            f"{PHASE_NAMES[phase]} {values[phase] // 10}.{values[phase] % 10}ms"
+            for phase in range(PHASE_COUNT)
+        )
+        sasppu.fill_sprite(
+            self.graphics_x,
+            self.graphics_y,
+            self.width,
+            self.height,
+            sasppu.TRANSPARENT_BLACK,
+        )
+        sasppu.draw_text_sprite(
+            self.graphics_x, self.graphics_y, sasppu.WHITE, self.width, text
+        )
@@ -0,0 +1,97 @@
+import struct
+
+# replay log: magic, format version, RNG seed, frame count; then the button
+# mask of every frame, run-length encoded as (run length - 1, mask) byte pairs
+REPLAY_MAGIC = b"SPRL"
+REPLAY_VERSION = 1
+HEADER_FORMAT = "<4sBII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+MAX_RUN = 256
+
+
+class InputRecorder:
+    """
+    Records the button mask of every frame, plus the seed the session's RNG was
+    seeded with, so the session can be replayed exactly by InputPlayer.
+    """
+
+    seed: int
+    frames: int
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.frames = 0
+        self._runs = bytearray()
+        self._mask = -1
+        self._run = 0
+
+    def record(self, mask: int) -> None:
+        """Add one frame's button mask."""
+        self.frames += 1
+        if mask == self._mask and self._run < MAX_RUN:
+            self._run += 1
+            return
+        self._end_run()
+        self._mask = mask
+        self._run = 1
+
+    def _end_run(self) -> None:
+        if self._run:
+            self._runs.append(self._run - 1)
+            self._runs.append(self._mask)
+            self._run = 0
+
+    def data(self) -> bytes:
+        """The log so far."""
+        # frames recorded after this start a new run
+        self._end_run()
+        header = struct.pack(
+            HEADER_FORMAT, REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.frames
+        )
+        return header + bytes(self._runs)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.data())
+
+
+class InputPlayer:
+    """Plays back a log written by InputRecorder, one button mask per frame."""
+
+    seed: int
+    frames: int
+
+    def __init__(self, data: bytes):
+        magic, version, self.seed, self.frames = struct.unpack(
+            HEADER_FORMAT, data[:HEADER_SIZE]
+        )
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("Not a replay log")
+        self._runs = memoryview(data)[HEADER_SIZE:]
+        self._position = 0
+        self._left = 0
+        self._mask = 0
+        self.frame = 0
+
+    @classmethod
+    def load(cls, path: str) -> "InputPlayer":
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    @property
+    def done(self) -> bool:
+        return self.frame >= self.frames
+
+    def next(self) -> int:
+        """Button mask of the next frame (0 once the log has run out)."""
+        if self.frame >= self.frames:
+            return 0
+        self.frame += 1
+        if not self._left:
+            runs = self._runs
+            self._left = runs[self._position] + 1
+            self._mask = runs[self._position + 1]
+            self._position += 2
+        self._left -= 1
+        return self._mask
@@ -0,0 +1,101 @@
+import time
+
+
+class FixedStep:
+    """
+    Fixed-timestep clock: the game simulates in ticks of `tick_us` whatever the
+    frame rate, so a slow frame costs renders rather than game speed.
+
+    Once per frame, steps() adds the time since the last frame to an accumulator
+    and returns how many whole ticks to simulate. After a long stall it returns
+    at most `max_steps` and drops the rest of the backlog, so the game slows
+    down for a moment rather than spending ever longer catching up.
+
+        steps = clock.steps()
+        for _ in range(steps):
+            ...                         # one tick of input and movement
+        if not clock.skip_render():
+            await render_update()
+
+    With `lockstep`, every frame is exactly one tick and the clock is not read
+    at all (for headless runs, where frames are not in real time).
+    """
+
+    tick_us: int
+    max_steps: int
+    lockstep: bool
+    # ticks simulated and ticks dropped after stalls, since the start
+    ticks: int
+    dropped: int
+
+    def __init__(
+        self,
+        tick_us: int,
+        max_steps: int = 4,
+        max_skipped_renders: int = 0,
+        idle_ticks: int = 0,
+        lockstep: bool = False,
+    ):
+        self.tick_us = tick_us
+        self.max_steps = max_steps
+        self.max_skipped_renders = max_skipped_renders
+        self.idle_ticks = idle_ticks
+        self.lockstep = lockstep
+        self.ticks = 0
+        self.dropped = 0
+        self._accumulator = 0
+        self._last = time.ticks_us()
+        self._skipped = 0
+        self._quiet = 0
+        # ticks the last steps() call returned
+        self._steps = 0
+
+    def reset(self) -> None:
+        """Forget the time elapsed so far (e.g. after loading)."""
+        self._accumulator = 0
+        self._last = time.ticks_us()
+
+    def steps(self) -> int:
+        """Number of ticks to simulate this frame."""
+        if self.lockstep:
+            self.ticks += 1
+            self._steps = 1
+            return 1
+        now = time.ticks_us()
+        self._accumulator += time.ticks_diff(now, self._last)
+        self._last = now
+        steps = self._accumulator // self.tick_us
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+        # whole ticks are simulated or dropped; only the fraction carries over
+        self._accumulator %= self.tick_us
+        self.ticks += steps
+        self._steps = steps
+        return steps
+
+    @property
+    def behind(self) -> bool:
+        """Whether this frame had to catch up, simulating more than one tick."""
+        return self._steps > 1
+
+    def skip_render(self) -> bool:
+        """Whether to skip rendering this frame to catch up: only when behind,
+        and never more than max_skipped_renders frames in a row."""
+        if self._skipped < self.max_skipped_renders and self.behind:
+            self._skipped += 1
+            return True
+        self._skipped = 0
+        return False
+
+    def activity(self, active: bool) -> None:
+        """Note whether a tick had anything going on (input, animation)."""
+        if active:
+            self._quiet = 0
+        elif self._quiet < self.idle_ticks:
+            self._quiet += 1
+
+    @property
+    def idle(self) -> bool:
+        """Nothing has happened for idle_ticks ticks (never, if idle_ticks is 0)."""
+        return self.idle_ticks > 0 and self._quiet >= self.idle_ticks
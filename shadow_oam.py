@@ -0,0 +1,157 @@
+from array import array
+
+import sasppu
+
+# dirty bits, one per sprite field
+DIRTY_X = 0x01
+DIRTY_Y = 0x02
+DIRTY_WIDTH = 0x04
+DIRTY_HEIGHT = 0x08
+DIRTY_GRAPHICS_X = 0x10
+DIRTY_GRAPHICS_Y = 0x20
+DIRTY_WINDOWS = 0x40
+DIRTY_FLAGS = 0x80
+DIRTY_ALL = 0xFF
+
+
+class ShadowOAM:
+    """
+    Python-side copy of sasppu.oam.
+
+    Every field of every sprite is kept in a flat array. Writes only mark a field
+    dirty when its value actually changes, and flush() pushes the dirty fields of
+    the dirty slots to the hardware OAM in one go, once per frame.
+
+    `target` replaces sasppu.oam as the destination of flush() (anything
+    indexable whose items take the sprite fields, e.g. plain stand-in objects
+    for benchmarks).
+    """
+
+    count: int
+    x: array
+    y: array
+    width: array
+    height: array
+    graphics_x: array
+    graphics_y: array
+    windows: array
+    flags: array
+
+    def __init__(self, count: int = sasppu.SPRITE_COUNT, target=None):
+        self.count = count
+        self.target = target
+        self.x = array("h", bytes(2 * count))
+        self.y = array("h", bytes(2 * count))
+        self.width = array("H", bytes(2 * count))
+        self.height = array("H", bytes(2 * count))
+        self.graphics_x = array("H", bytes(2 * count))
+        self.graphics_y = array("H", bytes(2 * count))
+        self.windows = array("B", bytes(count))
+        self.flags = array("B", bytes(count))
+        # per-slot dirty field mask, plus the list of slots queued for the next flush
+        self._dirty = array("B", bytes(count))
+        self._queue = array("H", bytes(2 * count))
+        self._queued = 0
+
+    def _mark(self, slot: int, bits: int) -> None:
+        dirty = self._dirty[slot]
+        if not dirty:
+            self._queue[self._queued] = slot
+            self._queued += 1
+        self._dirty[slot] = dirty | bits
+
+    def init(
+        self,
+        slot: int,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        graphics_x: int,
+        graphics_y: int,
+        windows: int,
+        flags: int,
+    ) -> None:
+        """Set every field of a slot. All of them are written on the next flush,
+        since the hardware state of a freshly claimed slot is unknown."""
+        self.x[slot] = x
+        self.y[slot] = y
+        self.width[slot] = width
+        self.height[slot] = height
+        self.graphics_x[slot] = graphics_x
+        self.graphics_y[slot] = graphics_y
+        self.windows[slot] = windows
+        self.flags[slot] = flags
+        self._mark(slot, DIRTY_ALL)
+
+    def set_xy(self, slot: int, x: int, y: int) -> None:
+        """Set the screen position of a slot."""
+        bits = 0
+        if self.x[slot] != x:
+            self.x[slot] = x
+            bits = DIRTY_X
+        if self.y[slot] != y:
+            self.y[slot] = y
+            bits |= DIRTY_Y
+        if bits:
+            self._mark(slot, bits)
+
+    def set_graphics(self, slot: int, graphics_x: int, graphics_y: int) -> None:
+        """Set the sprite sheet offset of a slot."""
+        bits = 0
+        if self.graphics_x[slot] != graphics_x:
+            self.graphics_x[slot] = graphics_x
+            bits = DIRTY_GRAPHICS_X
+        if self.graphics_y[slot] != graphics_y:
+            self.graphics_y[slot] = graphics_y
+            bits |= DIRTY_GRAPHICS_Y
+        if bits:
+            self._mark(slot, bits)
+
+    def set_flags(self, slot: int, flags: int) -> None:
+        """Set the flags (ENABLED, FLIP_X, ...) of a slot."""
+        if self.flags[slot] != flags:
+            self.flags[slot] = flags
+            self._mark(slot, DIRTY_FLAGS)
+
+    def show(self, slot: int) -> None:
+        """Set the ENABLED flag of a slot, keeping the other flags."""
+        self.set_flags(slot, self.flags[slot] | sasppu.ENABLED)
+
+    def hide(self, slot: int) -> None:
+        """Clear the ENABLED flag of a slot, keeping the other flags."""
+        self.set_flags(slot, self.flags[slot] & ~sasppu.ENABLED)
+
+    def flush(self) -> int:
+        """Write the dirty fields to the OAM. Returns the number of slots written."""
+        queued = self._queued
+        if not queued:
+            return 0
+        oam = self.target
+        if oam is None:
+            oam = sasppu.oam
+        dirty = self._dirty
+        queue = self._queue
+        for i in range(queued):
+            slot = queue[i]
+            bits = dirty[slot]
+            dirty[slot] = 0
+            spr = oam[slot]
+            if bits & DIRTY_X:
+                spr.x = self.x[slot]
+            if bits & DIRTY_Y:
+                spr.y = self.y[slot]
+            if bits & DIRTY_WIDTH:
+                spr.width = self.width[slot]
+            if bits & DIRTY_HEIGHT:
+                spr.height = self.height[slot]
+            if bits & DIRTY_GRAPHICS_X:
+                spr.graphics_x = self.graphics_x[slot]
+            if bits & DIRTY_GRAPHICS_Y:
+                spr.graphics_y = self.graphics_y[slot]
+            if bits & DIRTY_WINDOWS:
+                spr.windows = self.windows[slot]
+            if bits & DIRTY_FLAGS:
+                spr.flags = self.flags[slot]
+        self._queued = 0
+        return queued
@@ -0,0 +1,234 @@
+import random
+import struct
+import time
+from array import array
+
+import sasppu
+
+from .world import World
+from .player import Player
+from .direction import DirectionTuple, FACING_COUNT
+from .controls import DIRECTIONS
+from .kinds import KIND_COUNT
+
+# snapshot file: magic, format version, world mode, world size in tiles, player
+# position, facing index and animation tick, and the seed the RNG is seeded with
+# on restore. Then, for a fixed world, the number of
+# objects, the tile index (y * width + x) of each, and a byte per object with
+# its kind | TILE_FLIP_X; for a chunked world, the world seed, chunk size and
+# number of edited chunks, then per chunk its key, edit count and edits as in
+# ChunkManager.diffs. Everything is little-endian, as on the badge.
+SNAPSHOT_MAGIC = b"SPWS"
+SNAPSHOT_VERSION = 1
+HEADER_FORMAT = "<4sBBHHiiBHI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FIXED_FORMAT = "<I"
+FIXED_SIZE = struct.calcsize(FIXED_FORMAT)
+CHUNKED_FORMAT = "<IBH"
+CHUNKED_SIZE = struct.calcsize(CHUNKED_FORMAT)
+DIFF_FORMAT = "<IH"
+DIFF_SIZE = struct.calcsize(DIFF_FORMAT)
+
+MODE_FIXED = 0
+MODE_CHUNKED = 1
+
+# tile byte: object kind in the low bits, and whether it is mirrored
+TILE_KIND_MASK = 0x0F
+TILE_FLIP_X = 0x10
+
+
+class Snapshot:
+    """
+    Saves and restores the World (the objects on its tiles) and the Player, so
+    the app can start up where it left off instead of generating a new world.
+
+    Only occupied tiles are stored, so saving and restoring cost depends on the
+    number of objects, not the size of the world. The file is built in one
+    buffer and written in one go, and restoring reads it straight into arrays
+    sized from its header, so nothing is allocated per object beyond the world's
+    own bookkeeping. A chunked world only needs the player's edits, since
+    everything else is regenerated from the seed.
+
+    restore() expects a freshly created world, with only the player set.
+    """
+
+    world: World
+    player: Player
+
+    def __init__(self, world: World, player: Player):
+        self.world = world
+        self.player = player
+        self._header = bytearray(HEADER_SIZE)
+
+    def _pack_header(self, buffer, seed: int) -> None:
+        world = self.world
+        player = self.player
+        width, height = world.world_size_tiles
+        struct.pack_into(
+            HEADER_FORMAT,
+            buffer,
+            0,
+            SNAPSHOT_MAGIC,
+            SNAPSHOT_VERSION,
+            MODE_CHUNKED if world.chunks is not None else MODE_FIXED,
+            width,
+            height,
+            player.x,
+            player.y,
+            DirectionTuple.index(player.facing),
+            player.tick & 0xFFFF,
+            seed,
+        )
+
+    def save(self, path: str) -> None:
+        """Write the world and player to a file. The RNG is left alone (saving
+        can happen mid-session); the seed the restored session will use is
+        taken from the clock instead."""
+        seed = time.ticks_us() & 0x3FFFFFFF
+        if self.world.chunks is not None:
+            data = self._chunked_data(seed)
+        else:
+            data = self._fixed_data(seed)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _fixed_data(self, seed: int) -> bytearray:
+        world = self.world
+        width = world.grid.width
+        flip_x = sasppu.FLIP_X
+        entities = world.entities
+        count = len(entities)
+        start = HEADER_SIZE + FIXED_SIZE
+        data = bytearray(start + 5 * count)
+        self._pack_header(data, seed)
+        struct.pack_into(FIXED_FORMAT, data, HEADER_SIZE, count)
+        tiles = memoryview(data)[start + 4 * count :]
+        kind = entities.kind
+        flags = entities.flags
+        tile_x = entities.tile_x
+        tile_y = entities.tile_y
+        i = 0
+        for entity in entities.ids():
+            struct.pack_into(
+                "<I", data, start + 4 * i, tile_y[entity] * width + tile_x[entity]
+            )
+            tiles[i] = kind[entity] | (TILE_FLIP_X if flags[entity] & flip_x else 0)
+            i += 1
+        return data
+
+    def _chunked_data(self, seed: int) -> bytearray:
+        chunks = self.world.chunks
+        diffs = chunks.diffs
+        size = HEADER_SIZE + CHUNKED_SIZE
+        for diff in diffs.values():
+            size += DIFF_SIZE + 2 * len(diff)
+        data = bytearray(size)
+        self._pack_header(data, seed)
+        struct.pack_into(
+            CHUNKED_FORMAT,
+            data,
+            HEADER_SIZE,
+            chunks.seed,
+            chunks.chunk_tiles,
+            len(diffs),
+        )
+        offset = HEADER_SIZE + CHUNKED_SIZE
+        for key, diff in diffs.items():
+            struct.pack_into(DIFF_FORMAT, data, offset, key, len(diff))
+            offset += DIFF_SIZE
+            edits = bytes(diff)
+            data[offset : offset + len(edits)] = edits
+            offset += len(edits)
+        return data
+
+    def restore(self, path: str) -> bool:
+        """Load a snapshot written by save(). Returns False, changing nothing,
+        if there is none, it does not fit this world (size, mode, seed) or its
+        objects are invalid (unknown kind, tile outside the world or repeated)."""
+        world = self.world
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return False
+        with f:
+            header = self._header
+            if f.readinto(header) != HEADER_SIZE:
+                return False
+            magic, version, mode, width, height, x, y, facing, tick, seed = (
+                struct.unpack_from(HEADER_FORMAT, header)
+            )
+            if (
+                magic != SNAPSHOT_MAGIC
+                or version != SNAPSHOT_VERSION
+                or facing >= FACING_COUNT
+                or (width, height) != tuple(world.world_size_tiles)
+                or mode != (MODE_CHUNKED if world.chunks is not None else MODE_FIXED)
+            ):
+                return False
+            if world.chunks is not None:
+                restored = self._read_diffs(f)
+            else:
+                restored = self._read_objects(f)
+            if not restored:
+                return False
+        self.player.restore(x, y, DIRECTIONS[facing], tick)
+        random.seed(seed)
+        return True
+
+    def _read_objects(self, f) -> bool:
+        # the section headers fit in the snapshot header's buffer
+        info = memoryview(self._header)[:FIXED_SIZE]
+        if f.readinto(info) != FIXED_SIZE:
+            return False
+        count = struct.unpack_from(FIXED_FORMAT, info)[0]
+        indices = array("I", bytes(4 * count))
+        tiles = bytearray(count)
+        if f.readinto(indices) != 4 * count or f.readinto(tiles) != count:
+            return False
+        world = self.world
+        width = world.grid.width
+        tiles_total = width * world.grid.height
+        # check every record before placing any, so a bad file changes nothing;
+        # one bit per tile catches a tile that is listed twice
+        seen = bytearray((tiles_total + 7) >> 3)
+        for i in range(count):
+            kind = tiles[i] & TILE_KIND_MASK
+            index = indices[i]
+            if not 0 < kind < KIND_COUNT or index >= tiles_total:
+                return False
+            bit = 1 << (index & 7)
+            if seen[index >> 3] & bit:
+                return False
+            seen[index >> 3] |= bit
+        flip_x = sasppu.FLIP_X
+        for i in range(count):
+            tile = tiles[i]
+            index = indices[i]
+            world._place(
+                index % width,
+                index // width,
+                tile & TILE_KIND_MASK,
+                flip_x if tile & TILE_FLIP_X else 0,
+            )
+        return True
+
+    def _read_diffs(self, f) -> bool:
+        chunks = self.world.chunks
+        info = memoryview(self._header)[:CHUNKED_SIZE]
+        if f.readinto(info) != CHUNKED_SIZE:
+            return False
+        seed, chunk_tiles, count = struct.unpack_from(CHUNKED_FORMAT, info)
+        if seed != chunks.seed or chunk_tiles != chunks.chunk_tiles:
+            return False
+        header = memoryview(self._header)[:DIFF_SIZE]
+        diffs = {}
+        for _ in range(count):
+            if f.readinto(header) != DIFF_SIZE:
+                return False
+            key, edits = struct.unpack_from(DIFF_FORMAT, header)
+            diff = array("H", bytes(2 * edits))
+            if f.readinto(diff) != 2 * edits:
+                return False
+            diffs[key] = diff
+        chunks.diffs = diffs
+        return True
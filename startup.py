@@ -0,0 +1,111 @@
+from array import array
+
+import time
+
+# startup stages, in the order they run after the first frame
+STAGE_BACKGROUND = 0
+STAGE_SHEET = 1
+STAGE_WORLD = 2
+STAGE_INTRO = 3
+STAGE_COUNT = 4
+
+STAGE_NAMES = ("background", "sheet", "world", "intro")
+
+
+class Startup:
+    """
+    Staged startup, so the launcher is not stalled until everything is loaded.
+
+    The app constructor only does what the first frame needs, and the rest is
+    added here as stages that run() hands a slice of each frame to until they
+    are done:
+
+        startup.add(STAGE_SHEET, self.load_sheet)
+        ...
+        while not startup.done:
+            await render_update()
+            startup.end_frame()
+            startup.step()
+
+    A stage is a function that either does all its work and returns None, or
+    is a generator that does a piece per next(); step() resumes stages until
+    its slice is used up, so a generator stage is spread over frames.
+
+    Every stage is timed (microseconds, and frames it was worked on in), as
+    are the time to the first frame and until all stages are done, both from
+    when the Startup was created.
+    """
+
+    slice_us: int
+    budget_us: int
+    # per stage: time spent in it, and frames it was worked on in
+    stage_us: array
+    stage_frames: array
+    # from creation to the end of the first frame, and to the last stage done
+    first_frame_us: int
+    ready_us: int
+    # frames rendered so far
+    frames: int
+
+    def __init__(self, slice_us: int, budget_us: int):
+        self._start = time.ticks_us()
+        self.slice_us = slice_us
+        self.budget_us = budget_us
+        self.stage_us = array("I", bytes(4 * STAGE_COUNT))
+        self.stage_frames = array("H", bytes(2 * STAGE_COUNT))
+        self.first_frame_us = 0
+        self.ready_us = 0
+        self.frames = 0
+        self._stages: list = []
+        self._next = 0
+        # generator of the stage in progress, if it has one
+        self._pieces = None
+
+    def add(self, stage: int, work) -> None:
+        """Queue a stage; they run in the order they are added."""
+        self._stages.append((stage, work))
+
+    @property
+    def done(self) -> bool:
+        return self._next >= len(self._stages)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.first_frame_us > self.budget_us
+
+    def step(self) -> None:
+        """Work on the stages for up to slice_us (at least one piece)."""
+        stages = self._stages
+        start = time.ticks_us()
+        counted = -1
+        while self._next < len(stages):
+            stage, work = stages[self._next]
+            if stage != counted:
+                self.stage_frames[stage] += 1
+                counted = stage
+            began = time.ticks_us()
+            if self._pieces is None:
+                self._pieces = work()
+                finished = self._pieces is None
+            else:
+                try:
+                    next(self._pieces)
+                    finished = False
+                except StopIteration:
+                    finished = True
+            now = time.ticks_us()
+            self.stage_us[stage] += time.ticks_diff(now, began)
+            if finished:
+                self._pieces = None
+                self._next += 1
+                if self.done:
+                    self.ready_us = time.ticks_diff(now, self._start)
+            if time.ticks_diff(now, start) >= self.slice_us:
+                break
+
+    def end_frame(self) -> None:
+        """Note that a frame was rendered; the first one stops the clock on
+        time to first frame."""
+        self.frames += 1
+        if self.frames == 1:
+            self.first_frame_us = time.ticks_diff(time.ticks_us(), self._start)
@@ -0,0 +1,195 @@
+import sasppu
+
+from .packing import pack_key
+from .constants import BG_TILE_SIZE, BG_GRAPHICS_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT
+
+# map entry layout: index of an 8x8 tile in background graphics memory
+# (row-major) above the two flip bits
+MAP_FLIP_X = 0x1
+MAP_FLIP_Y = 0x2
+MAP_INDEX_SHIFT = 2
+
+# scenery entry: where the image is on the sprite sheet, and its sprite flags
+SCENERY_X_SHIFT = 20
+SCENERY_Y_SHIFT = 8
+SCENERY_Y_MASK = 0xFFF
+
+
+def map_entry(bg_x: int, bg_y: int, flags: int = 0) -> int:
+    """Map entry for the 8x8 background tile whose top-left pixel is (bg_x, bg_y)."""
+    tiles_per_row = BG_GRAPHICS_WIDTH // BG_TILE_SIZE
+    index = (bg_y // BG_TILE_SIZE) * tiles_per_row + bg_x // BG_TILE_SIZE
+    return (index << MAP_INDEX_SHIFT) | flags
+
+
+def blit_from_sheet(
+    sheet: bytes | memoryview,
+    sheet_width: int,
+    src_x: int,
+    src_y: int,
+    width: int,
+    height: int,
+    dst_x: int,
+    dst_y: int,
+) -> None:
+    """Copy a rectangle of a raw BGR555 sprite sheet into background graphics
+    memory, row by row, keeping whatever is underneath transparent pixels."""
+    view = memoryview(sheet)
+    row_bytes = width * 2
+    for row in range(height):
+        start = ((src_y + row) * sheet_width + src_x) * 2
+        sasppu.blit_background_transparent(
+            dst_x, dst_y + row, width, 1, view[start : start + row_bytes]
+        )
+
+
+class TileMap:
+    """
+    Static scenery drawn into a background map instead of OAM.
+
+    World objects marked static are written into the map once, and the camera
+    is just the background's scroll registers, so per-frame camera cost does
+    not depend on how much scenery there is.
+
+    The map wraps around. Worlds that fit in it with a screen's worth of tiles
+    to spare (so the wrap never shows the far side of the world past its edge)
+    are written once; larger worlds keep a window of world tiles around the
+    camera resident, and when the camera crosses a world tile boundary only
+    the row/column that came into the window is rewritten.
+    """
+
+    tile_size: int
+    # world tile key -> graphics_x << SCENERY_X_SHIFT | graphics_y <<
+    # SCENERY_Y_SHIFT | flags of the static object on it
+    scenery: dict[int, int]
+    # (graphics_x, graphics_y) on the sprite sheet -> background graphics (x, y)
+    tiles: dict[tuple[int, int], tuple[int, int]]
+
+    def __init__(
+        self,
+        background: sasppu.Background,
+        tile_size: int,
+        world_size_tiles: tuple[int, int],
+        layer: sasppu.MAP = sasppu.bg0,
+        ground: tuple[int, int] = (0, 0),
+        screen_size: tuple[int, int] = (SCREEN_WIDTH, SCREEN_HEIGHT),
+    ):
+        self.background = background
+        self.layer = layer
+        self.tile_size = tile_size
+        # map tiles per world tile, and world tiles the map can hold
+        self.span = tile_size // BG_TILE_SIZE
+        self.map_tiles_w = sasppu.MAP_WIDTH // self.span
+        self.map_tiles_h = sasppu.MAP_HEIGHT // self.span
+        self.map_px_w = sasppu.MAP_WIDTH * BG_TILE_SIZE
+        self.map_px_h = sasppu.MAP_HEIGHT * BG_TILE_SIZE
+        # world tiles a view can touch, partly covered ones at both edges included
+        view_w = -(-screen_size[0] // tile_size) + 1
+        view_h = -(-screen_size[1] // tile_size) + 1
+        self.streaming = (
+            world_size_tiles[0] + view_w > self.map_tiles_w
+            or world_size_tiles[1] + view_h > self.map_tiles_h
+        )
+        self.scenery = {}
+        self.tiles = {}
+        self.ground_entry = map_entry(ground[0], ground[1])
+        # top-left world tile of the resident window (streaming only)
+        self._window_x = 0
+        self._window_y = 0
+        for i in range(len(layer)):
+            layer[i] = self.ground_entry
+
+    def define_tile(
+        self, graphics_x: int, graphics_y: int, bg_x: int, bg_y: int
+    ) -> None:
+        """Tell the map where the background copy of a sprite sheet image lives."""
+        self.tiles[(graphics_x, graphics_y)] = (bg_x, bg_y)
+
+    def add(
+        self, tile_x: int, tile_y: int, graphics_x: int, graphics_y: int, flags: int
+    ) -> None:
+        """Add a static object (its sprite sheet image and sprite flags) at a
+        tile and draw it if it is resident."""
+        self.scenery[pack_key(tile_x, tile_y)] = (
+            (graphics_x << SCENERY_X_SHIFT) | (graphics_y << SCENERY_Y_SHIFT) | flags
+        )
+        if self._resident(tile_x, tile_y):
+            self._write_tile(tile_x, tile_y)
+
+    def remove(self, tile_x: int, tile_y: int) -> None:
+        """Remove the static object at a tile, putting ground back."""
+        key = pack_key(tile_x, tile_y)
+        if key in self.scenery:
+            del self.scenery[key]
+            if self._resident(tile_x, tile_y):
+                self._write_tile(tile_x, tile_y)
+
+    def _resident(self, tile_x: int, tile_y: int) -> bool:
+        if not self.streaming:
+            return True
+        return (
+            0 <= tile_x - self._window_x < self.map_tiles_w
+            and 0 <= tile_y - self._window_y < self.map_tiles_h
+        )
+
+    def _write_tile(self, tile_x: int, tile_y: int) -> None:
+        """Write the map entries covering one world tile."""
+        span = self.span
+        layer = self.layer
+        width_power = sasppu.MAP_WIDTH_POWER
+        mask_x = sasppu.MAP_WIDTH - 1
+        mask_y = sasppu.MAP_HEIGHT - 1
+        map_x = tile_x * span
+        map_y = tile_y * span
+        scenery = self.scenery.get(pack_key(tile_x, tile_y))
+        if scenery is None:
+            entry = self.ground_entry
+            for j in range(span):
+                row = ((map_y + j) & mask_y) << width_power
+                for i in range(span):
+                    layer[row | ((map_x + i) & mask_x)] = entry
+            return
+        bg_x, bg_y = self.tiles[
+            (
+                scenery >> SCENERY_X_SHIFT,
+                (scenery >> SCENERY_Y_SHIFT) & SCENERY_Y_MASK,
+            )
+        ]
+        flags = 0
+        if scenery & sasppu.FLIP_X:
+            flags |= MAP_FLIP_X
+        if scenery & sasppu.FLIP_Y:
+            flags |= MAP_FLIP_Y
+        for j in range(span):
+            src_j = span - 1 - j if flags & MAP_FLIP_Y else j
+            row = ((map_y + j) & mask_y) << width_power
+            for i in range(span):
+                src_i = span - 1 - i if flags & MAP_FLIP_X else i
+                layer[row | ((map_x + i) & mask_x)] = map_entry(
+                    bg_x + src_i * BG_TILE_SIZE, bg_y + src_j * BG_TILE_SIZE, flags
+                )
+
+    def scroll(self, cam_left: int, cam_top: int) -> None:
+        """Point the background at the camera, streaming in scenery if needed."""
+        self.background.x = cam_left & (self.map_px_w - 1)
+        self.background.y = cam_top & (self.map_px_h - 1)
+        if not self.streaming:
+            return
+        # keep one world tile of margin on the top/left of the view
+        window_x = cam_left // self.tile_size - 1
+        window_y = cam_top // self.tile_size - 1
+        dx = window_x - self._window_x
+        dy = window_y - self._window_y
+        if not dx and not dy:
+            return
+        old_x = self._window_x
+        old_y = self._window_y
+        self._window_x = window_x
+        self._window_y = window_y
+        w = self.map_tiles_w
+        h = self.map_tiles_h
+        for ty in range(window_y, window_y + h):
+            row_new = not (0 <= ty - old_y < h)
+            for tx in range(window_x, window_x + w):
+                if row_new or not (0 <= tx - old_x < w):
+                    self._write_tile(tx, ty)
@@ -0,0 +1,132 @@
+from array import array
+
+import time
+
+from .direction import DirectionTuple
+from .controls import DIRECTIONS
+from .startup import STAGE_NAMES
+from .constants import TRACE_LEVEL, TRACE_CAPACITY
+
+# levels; events above TRACE_LEVEL are never recorded. Call sites test the level
+# themselves, so a disabled event costs one comparison and its arguments are
+# not even evaluated:
+#
+#     if TRACE_LEVEL >= TRACE_DEBUG:
+#         trace(EV_FACING, facing)
+TRACE_OFF = 0
+TRACE_WARN = 1
+TRACE_INFO = 2
+TRACE_DEBUG = 3
+
+# event codes, with up to ARGS integer arguments each
+EV_WORLD_INIT = 1  # tile size, width, height (tiles)
+EV_TILE_TAKEN = 2  # tile x, tile y
+EV_PLACE = 3  # tile x, tile y, tile size
+EV_PLACE_RANDOM = 4  # tile x, tile y, tile size
+EV_CREATE = 5  # count, kind
+EV_INIT_SPRITE = 6  # slot, x, y, graphics x, graphics y
+EV_FACING = 7  # facing index
+EV_REPLAY = 8  # 1 if replaying (0 recording), seed
+EV_STARTUP_STAGE = 9  # stage, microseconds, frames
+EV_FIRST_FRAME = 10  # microseconds, budget
+EV_STARTUP_DONE = 11  # microseconds, frames
+
+ARGS = 5
+# per event: code, ticks_ms when it happened, then the arguments
+EVENT_WORDS = 2 + ARGS
+
+_KIND_NAMES = ("nothing", "trees", "caves", "poos")
+
+# per event: how it reads; a format string for the arguments, or a function
+# of them. Only used when the buffer is dumped, never while recording.
+FORMATS = {
+    EV_WORLD_INIT: "World initialized with tile size {} and size ({}, {}) tiles",
+    EV_TILE_TAKEN: "Tile ({}, {}) not free",
+    EV_PLACE: lambda a, b, c, d, e: (
+        f"Placing sprite at tile ({a}, {b}) with xy ({a * c}, {b * c})"
+    ),
+    EV_PLACE_RANDOM: lambda a, b, c, d, e: (
+        f"Placing sprite at random tile ({a}, {b}) with xy ({a * c}, {b * c})"
+    ),
+    EV_CREATE: lambda a, b, c, d, e: f"creating {a} {_KIND_NAMES[b]}",
+    EV_INIT_SPRITE: "placing sprite {} at ({}, {}) with graphics ({}, {})",
+    EV_FACING: lambda a, b, c, d, e: (
+        "Facing " + DirectionTuple.to_string(DIRECTIONS[a])
+    ),
+    EV_REPLAY: lambda a, b, c, d, e: f"{'replay' if a else 'record'} with seed {b}",
+    EV_STARTUP_STAGE: lambda a, b, c, d, e: (
+        f"startup {STAGE_NAMES[a]}: {b} us over {c} frames"
+    ),
+    EV_FIRST_FRAME: lambda a, b, c, d, e: (
+        f"first frame after {a} us (budget {b} us{', over' if a > b else ''})"
+    ),
+    EV_STARTUP_DONE: "startup done after {} us, {} frames",
+}
+
+
+class Tracer:
+    """
+    Ring buffer of structured trace events: an event code and a few integers,
+    written into an array allocated up front, so recording an event formats
+    nothing and allocates nothing. When the buffer is full the oldest events
+    are overwritten (and counted as dropped).
+
+    Events are only turned into text by dump(), which the app calls outside
+    the frame loop (after startup, when going idle, and on cleanup).
+    """
+
+    capacity: int
+    # events recorded since the last dump, including overwritten ones
+    count: int
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.events = array("i", bytes(4 * EVENT_WORDS * capacity))
+        self.count = 0
+
+    def record(
+        self, code: int, a: int = 0, b: int = 0, c: int = 0, d: int = 0, e: int = 0
+    ) -> None:
+        if not self.capacity:
+            return
+        events = self.events
+        i = (self.count % self.capacity) * EVENT_WORDS
+        events[i] = code
+        events[i + 1] = time.ticks_ms() & 0x7FFFFFFF
+        events[i + 2] = a
+        events[i + 3] = b
+        events[i + 4] = c
+        events[i + 5] = d
+        events[i + 6] = e
+        self.count += 1
+
+    def lines(self):
+        """Iterate over the buffered events, oldest first, as text."""
+        n = min(self.count, self.capacity)
+        if self.count > n:
+            yield f"({self.count - n} older trace events dropped)"
+        events = self.events
+        for event in range(self.count - n, self.count):
+            i = (event % self.capacity) * EVENT_WORDS
+            code = events[i]
+            args = events[i + 2 : i + EVENT_WORDS]
+            form = FORMATS.get(code)
+            if form is None:
+                text = f"event {code} {tuple(args)}"
+            elif isinstance(form, str):
+                text = form.format(*args)
+            else:
+                text = form(*args)
+            yield f"[{events[i + 1]}] {text}"
+
+    def dump(self, out=print) -> None:
+        """Format and print (or pass to `out`) the buffered events, then empty
+        the buffer."""
+        for line in self.lines():
+            out(line)
+        self.count = 0
+
+
+# the app's tracer; empty when tracing is off
+tracer = Tracer(TRACE_CAPACITY if TRACE_LEVEL else 0)
+trace = tracer.record
@@ -1,17 +1,64 @@
-from sasppu import Sprite
 import random
 
+import sasppu
+
 from .player import Player
+from .shadow_oam import ShadowOAM
+from .oam_pool import OAMPool
+from .tilemap import TileMap
+from .chunks import ChunkManager
+from .grid import OccupancyGrid, IndexedFreeSet
+from .entities import EntityStore, NO_ENTITY, PLAYER
+from .packing import pack_key
+from .kinds import KIND_NONE, SOLID, STATIC, GRAPHICS, WIDTH, HEIGHT
+from .trace import (
+    trace,
+    TRACE_WARN,
+    TRACE_INFO,
+    EV_WORLD_INIT,
+    EV_TILE_TAKEN,
+    EV_PLACE,
+    EV_PLACE_RANDOM,
+)
+from .constants import TRACE_LEVEL
 
 
 class World:
     """
     World handles positioning of game objects relative to the player (camera).
     Coordinates are in pixels. The world is tile-based, with tile_size defining the grid.
+
+    Objects are entities: integer ids into the column arrays of an EntityStore
+    (kind, tile, flip flags, OAM slot, ...), see entities.py. Tile occupancy is
+    a dense grid of 16-bit entity ids (see grid.py), and free tiles are an
+    indexed set, so placing, looking up and removing objects does not allocate.
+
+    Each frame, the objects in view are mapped onto physical OAM slots
+    taken from the pool (nearest the camera first, if there are more of
+    them than free slots), and the slots of the ones that left the view
+    are handed back. Writes go to the shadow OAM and reach the hardware on
+    ShadowOAM.flush().
+
+    Objects are also bucketed into screen-sized cells so that update() only has
+    to look at the cells overlapping the camera, not at every object in the world.
+
+    With a tilemap, static objects are drawn into the background map instead and
+    the camera only moves the background.
+
+    Given a seed, the world is chunked instead: there is no up-front grid, and
+    chunks (each with its own small grid) are generated around the player as it
+    moves (see ChunkManager).
     """
 
     world_size_tiles: tuple[int, int]
     screen_size: tuple[int, int]
+    # spatial index: cell key -> ids of the objects in that cell
+    cells: dict[int, list[int]]
+    # every object in the world; the occupancy grids hold their ids
+    entities: EntityStore
+    # occupancy and free tiles of a fixed-size world (None when chunked)
+    grid: OccupancyGrid | None
+    free_tiles: IndexedFreeSet | None
 
     def __init__(
         self,
@@ -19,95 +66,464 @@ class World:
         world_size_tiles: tuple[int, int],
         screen_width: int,
         screen_height: int,
+        oam: ShadowOAM,
+        pool: OAMPool,
+        tilemap: TileMap | None = None,
+        seed: int | None = None,
+        chunk_tiles: int = 8,
+        view_distance: int = 1,
     ):
+        self.oam = oam
+        self.pool = pool
+        self.tilemap = tilemap
         self.tile_size = tile_size
         self.screen_size = (screen_width, screen_height)
         self.screen_center_x = self.screen_size[0] // 2
         self.screen_center_y = self.screen_size[1] // 2
         self.world_size_tiles = world_size_tiles
         self.player: Player | None = None
-        self.player_sprite: Sprite | None = None
-        # map from (tile_x, tile_y) to sprite
-        self.objects: dict[tuple[int, int], Sprite] = {}
-        # initialize free tile list and shuffle for random placement
-        self.free_tiles: list[tuple[int, int]] = [
-            (x, y)
-            for x in range(self.world_size_tiles[0])
-            for y in range(self.world_size_tiles[1])
-        ]
-        self._shuffle_free_tiles()
-        print(
-            f"World initialized with tile size {self.tile_size} and size {self.world_size_tiles} tiles"
-        )
+        self.entities = EntityStore()
+        # cells are as big as the screen, so the camera overlaps at most 2x2 of them
+        self.cell_size = max(screen_width, screen_height)
+        self.cells = {}
+        # ids of the objects currently holding an OAM slot, and of the ones in
+        # view this frame
+        self._mapped: list[int] = []
+        self._visible: list[int] = []
+        # ids of everything holding a slot (PLAYER for the player), front-most
+        # first, and the slots they hold in ascending order; rebuilt when either
+        # set changes
+        self._order: list[int] = []
+        self._slots: list[int] = []
+        self._order_changed = False
+        self._frame = 0
+        self.chunks: ChunkManager | None = None
+        self.grid = None
+        self.free_tiles = None
+        if seed is not None:
+            # chunked world: objects are generated on demand
+            self.chunks = ChunkManager(self, seed, chunk_tiles, view_distance)
+        else:
+            width, height = world_size_tiles
+            self.grid = OccupancyGrid(width, height)
+            # random placement picks from the free set, so no shuffle is needed
+            self.free_tiles = IndexedFreeSet(width * height, full=True)
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_WORLD_INIT, tile_size, world_size_tiles[0], world_size_tiles[1])
+
+    def _grid_for(self, tile_x: int, tile_y: int) -> OccupancyGrid | None:
+        """The occupancy grid holding a tile, or None if the tile is not loaded."""
+        if self.chunks is not None:
+            return self.chunks.grid_for(tile_x, tile_y)
+        return self.grid
+
+    def object_at(self, tile_x: int, tile_y: int) -> int:
+        """Id of the object on a tile, or NO_ENTITY."""
+        grid = self._grid_for(tile_x, tile_y)
+        if grid is None:
+            return NO_ENTITY
+        return grid.get(tile_x, tile_y)
+
+    def object_at_point(self, world_x: int, world_y: int) -> int:
+        """Id of the object on the tile under a world pixel, or NO_ENTITY."""
+        tile_size = self.tile_size
+        return self.object_at(world_x // tile_size, world_y // tile_size)
+
+    def objects_touching(
+        self, world_x: int, world_y: int, width: int, height: int, out: list
+    ) -> int:
+        """Fill `out` (cleared first) with the ids of the objects on the tiles a
+        world-pixel box overlaps, and return how many there are. Only those few
+        tiles are looked at, however many objects the world holds."""
+        out.clear()
+        tile_size = self.tile_size
+        for tile_y in range(
+            world_y // tile_size, (world_y + height - 1) // tile_size + 1
+        ):
+            for tile_x in range(
+                world_x // tile_size, (world_x + width - 1) // tile_size + 1
+            ):
+                grid = self._grid_for(tile_x, tile_y)
+                if grid is None:
+                    continue
+                entity = grid.get(tile_x, tile_y)
+                if entity:
+                    out.append(entity)
+        return len(out)
 
-    def _shuffle_free_tiles(self) -> None:
-        """Shuffle self.free_tiles in place with Fisher–Yates algorithm."""
-        print("Shuffling free tiles for random placement")
-        n = len(self.free_tiles)
-        for i in range(n - 1, 0, -1):
-            # getrandbits is available in MicroPython; enough bits for n<=65536
-            j = random.getrandbits(16) % (i + 1)
-            # swap
-            self.free_tiles[i], self.free_tiles[j] = (
-                self.free_tiles[j],
-                self.free_tiles[i],
+    def blocked(self, world_x: int, world_y: int, width: int, height: int) -> bool:
+        """Whether a world-pixel box overlaps a solid object (see kinds.SOLID).
+        Unloaded tiles and tiles off the world are not solid."""
+        tile_size = self.tile_size
+        kind = self.entities.kind
+        for tile_y in range(
+            world_y // tile_size, (world_y + height - 1) // tile_size + 1
+        ):
+            for tile_x in range(
+                world_x // tile_size, (world_x + width - 1) // tile_size + 1
+            ):
+                grid = self._grid_for(tile_x, tile_y)
+                if grid is None:
+                    continue
+                entity = grid.get(tile_x, tile_y)
+                if entity and SOLID[kind[entity]]:
+                    return True
+        return False
+
+    def is_free(self, tile_x: int, tile_y: int) -> bool:
+        """Whether an object can be placed on a tile (loaded, in bounds and empty)."""
+        grid = self._grid_for(tile_x, tile_y)
+        if grid is None:
+            return False
+        i = grid.index(tile_x, tile_y)
+        return i >= 0 and not grid.cells[i]
+
+    def _index_object(self, tile_x: int, tile_y: int, entity: int) -> None:
+        """Add an object to the spatial index. It gets an OAM slot once the
+        camera sees it. Static objects go into the tilemap instead, if there is
+        one."""
+        entities = self.entities
+        kind = entities.kind[entity]
+        entities.tile_x[entity] = tile_x
+        entities.tile_y[entity] = tile_y
+        entities.depth[entity] = tile_y * self.tile_size + HEIGHT[kind]
+        if STATIC[kind] and self.tilemap is not None:
+            graphics_x, graphics_y = GRAPHICS[kind]
+            self.tilemap.add(
+                tile_x, tile_y, graphics_x, graphics_y, entities.flags[entity]
             )
-        print("Free tiles shuffled")
+            return
+        cell_size = self.cell_size
+        key = pack_key(
+            tile_x * self.tile_size // cell_size, tile_y * self.tile_size // cell_size
+        )
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = []
+        cell.append(entity)
+
+    def _unindex_object(self, entity: int) -> None:
+        """Take an object out of the spatial index (or the tilemap)."""
+        entities = self.entities
+        tile_x = entities.tile_x[entity]
+        tile_y = entities.tile_y[entity]
+        if STATIC[entities.kind[entity]] and self.tilemap is not None:
+            self.tilemap.remove(tile_x, tile_y)
+            return
+        cell_size = self.cell_size
+        key = pack_key(
+            tile_x * self.tile_size // cell_size, tile_y * self.tile_size // cell_size
+        )
+        cell = self.cells[key]
+        cell.remove(entity)
+        if not cell:
+            # so the index only covers where objects are (the loaded chunks),
+            # not everywhere the player has been
+            del self.cells[key]
+
+    def _place(self, tile_x: int, tile_y: int, kind: int, flags: int = 0) -> int:
+        """Create an object on a free, loaded tile without further checks, and
+        return its id."""
+        grid = self._grid_for(tile_x, tile_y)
+        assert grid is not None
+        i = grid.index(tile_x, tile_y)
+        entity = grid.cells[i] = self.entities.add(kind, flags)
+        if self.free_tiles is not None:
+            self.free_tiles.remove(i)
+        self._index_object(tile_x, tile_y, entity)
+        return entity
+
+    def _unplace(self, entity: int) -> None:
+        """Take an object out of the world again, releasing its OAM slot."""
+        entities = self.entities
+        grid = self._grid_for(entities.tile_x[entity], entities.tile_y[entity])
+        assert grid is not None
+        i = grid.index(entities.tile_x[entity], entities.tile_y[entity])
+        grid.cells[i] = NO_ENTITY
+        if self.free_tiles is not None:
+            self.free_tiles.add(i)
+        self._unindex_object(entity)
+        if entities.slot[entity] >= 0:
+            self._unmap(entity)
+            self._mapped.remove(entity)
+            # the id may be reused before the next update re-sorts the order
+            self._order.remove(entity)
+        entities.remove(entity)
 
     def set_player(self, player: Player) -> None:
-        """Attach the player entity to the world for camera centering."""
+        """Attach the player entity to the world for camera centering, and
+        give it the world to collide with."""
         self.player = player
-        self.player_sprite = player.sprite
-
-    def register_object(self, world_x: int, world_y: int, sprite: Sprite) -> None:
-        """Place a sprite at a given world position (in pixels) on the tile grid."""
-        key = (world_x // self.tile_size, world_y // self.tile_size)
-        if key in self.objects:
-            raise ValueError(f"Tile {key} already occupied")
-        self.objects[key] = sprite
-
-    def register_object_at_tile(self, tile_x: int, tile_y: int, sprite: Sprite) -> None:
-        """Place a sprite at a given tile position on the tile grid."""
-        key = (tile_x, tile_y)
-        if key in self.objects:
-            print(f"Tile {key} already occupied")
-            return
-        self.objects[key] = sprite
-        # set sprite world position (in pixels)
-        sprite.x = tile_x * self.tile_size
-        sprite.y = tile_y * self.tile_size
-        print(f"Placing sprite at tile {key} with xy ({sprite.x}, {sprite.y})")
-
-    def register_object_random(self, sprite: Sprite) -> None:
-        """Place a sprite at a random position on the tile grid.
-        Automatically avoids occupied tiles."""
+        player.world = self
+        # the player takes the reserved id's row in the slot and depth columns
+        self.entities.slot[PLAYER] = player.slot
+        self._order.append(PLAYER)
+        self._order_changed = True
+
+    def register_object(
+        self, world_x: int, world_y: int, kind: int, flags: int = 0
+    ) -> int:
+        """Place an object of a kind at a given world position (in pixels) on the
+        tile grid, and return its id."""
+        tile_x = world_x // self.tile_size
+        tile_y = world_y // self.tile_size
+        if not self.is_free(tile_x, tile_y):
+            raise ValueError(f"Tile ({tile_x}, {tile_y}) not free")
+        return self._place(tile_x, tile_y, kind, flags)
+
+    def register_object_at_tile(
+        self, tile_x: int, tile_y: int, kind: int, flags: int = 0
+    ) -> int:
+        """Place an object of a kind at a given tile position on the tile grid,
+        and return its id. Returns NO_ENTITY (and places nothing) if the tile is
+        taken or off the world."""
+        if not self.is_free(tile_x, tile_y):
+            if TRACE_LEVEL >= TRACE_WARN:
+                trace(EV_TILE_TAKEN, tile_x, tile_y)
+            return NO_ENTITY
+        entity = self._place(tile_x, tile_y, kind, flags)
+        if self.chunks is not None:
+            # keep player-placed objects across chunk evictions
+            self.chunks.record(tile_x, tile_y, kind)
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_PLACE, tile_x, tile_y, self.tile_size)
+        return entity
+
+    def register_object_random(self, kind: int, flags: int = 0) -> int:
+        """Place an object of a kind at a random position on the tile grid, and
+        return its id. Automatically avoids occupied tiles."""
         # ensure free tiles are available
         if not self.free_tiles:
             raise ValueError("No free tiles available to place sprite")
-        # pop a random tile key
-        key = self.free_tiles.pop()
-        tx, ty = key
-        self.objects[key] = sprite
-        print(
-            f"Going to attempt to place sprite at tile {key} ({tx}, {ty}) at {tx * self.tile_size}, {ty * self.tile_size})"
-        )
-        # set sprite world position (in pixels)
-        sprite.x = tx * self.tile_size
-        sprite.y = ty * self.tile_size
-        print(
-            f"Placing sprite at random tile {key} ({tx}, {ty}) with xy ({sprite.x}, {sprite.y})"
+        # getrandbits is available in MicroPython
+        i = self.free_tiles.pick(random.getrandbits(30))
+        assert self.grid is not None
+        tx = i % self.grid.width
+        ty = i // self.grid.width
+        entity = self._place(tx, ty, kind, flags)
+        if TRACE_LEVEL >= TRACE_INFO:
+            trace(EV_PLACE_RANDOM, tx, ty, self.tile_size)
+        return entity
+
+    def remove_object(self, tile_x: int, tile_y: int) -> int:
+        """Remove the object on a tile, if any, and return its kind (KIND_NONE
+        if there was nothing)."""
+        entity = self.object_at(tile_x, tile_y)
+        if not entity:
+            return KIND_NONE
+        kind = self.entities.kind[entity]
+        self._unplace(entity)
+        if self.chunks is not None:
+            self.chunks.record(tile_x, tile_y, KIND_NONE)
+        return kind
+
+    def move_object(self, entity: int, tile_x: int, tile_y: int) -> bool:
+        """Move an object to another tile, keeping its id and OAM slot.
+        Returns False (and leaves it where it is) if the target is not free."""
+        if not self.is_free(tile_x, tile_y):
+            return False
+        entities = self.entities
+        old_x = entities.tile_x[entity]
+        old_y = entities.tile_y[entity]
+        old_grid = self._grid_for(old_x, old_y)
+        new_grid = self._grid_for(tile_x, tile_y)
+        assert old_grid is not None and new_grid is not None
+        old_i = old_grid.index(old_x, old_y)
+        new_i = new_grid.index(tile_x, tile_y)
+        old_grid.cells[old_i] = NO_ENTITY
+        new_grid.cells[new_i] = entity
+        if self.free_tiles is not None:
+            self.free_tiles.add(old_i)
+            self.free_tiles.remove(new_i)
+        self._unindex_object(entity)
+        self._index_object(tile_x, tile_y, entity)
+        if self.chunks is not None:
+            self.chunks.record(old_x, old_y, KIND_NONE)
+            self.chunks.record(tile_x, tile_y, entities.kind[entity])
+        return True
+
+    def _write_sprite(self, entity: int) -> None:
+        """Write all of an object's sprite state to its OAM slot."""
+        entities = self.entities
+        kind = entities.kind[entity]
+        graphics_x, graphics_y = GRAPHICS[kind]
+        self.oam.init(
+            entities.slot[entity],
+            x=entities.screen_x[entity],
+            y=entities.screen_y[entity],
+            width=WIDTH[kind],
+            height=HEIGHT[kind],
+            graphics_x=graphics_x,
+            graphics_y=graphics_y,
+            windows=sasppu.WINDOW_ALL,
+            flags=entities.flags[entity] | sasppu.ENABLED,
         )
 
+    def _unmap(self, entity: int) -> None:
+        """Hide an object and give its OAM slot back to the pool."""
+        slot = self.entities.slot
+        self.oam.hide(slot[entity])
+        self.pool.release(slot[entity])
+        slot[entity] = -1
+        self._order_changed = True
+
     def update(self) -> None:
-        """Recompute screen positions for all sprites based on player camera."""
-        if not self.player or not self.player_sprite:
+        """Recompute screen positions for the sprites in view of the player camera.
+
+        Only the cells overlapping the camera rectangle are visited. Objects that
+        scroll into view are given an OAM slot, objects that scroll out of view
+        give theirs back, and everything else is left alone.
+        """
+        if not self.player:
             return
-        # reposition all world objects
-        for (tx, ty), sprite in self.objects.items():
-            dx = tx * self.tile_size - self.player.world_x
-            dy = ty * self.tile_size - self.player.world_y
-            sprite.x = self.screen_center_x + dx
-            sprite.y = self.screen_center_y + dy
+        oam = self.oam
+        tile_size = self.tile_size
+        if self.chunks is not None:
+            self.chunks.update(
+                self.player.world_x // tile_size, self.player.world_y // tile_size
+            )
+        cell_size = self.cell_size
+        screen_w, screen_h = self.screen_size
+        # world pixel shown at the top-left corner of the screen
+        cam_left = self.player.world_x - self.screen_center_x
+        cam_top = self.player.world_y - self.screen_center_y
+        # a tile is visible while any of it overlaps the screen
+        min_cx = (cam_left - tile_size + 1) // cell_size
+        max_cx = (cam_left + screen_w - 1) // cell_size
+        min_cy = (cam_top - tile_size + 1) // cell_size
+        max_cy = (cam_top + screen_h - 1) // cell_size
+        if self.tilemap is not None:
+            self.tilemap.scroll(cam_left, cam_top)
+
+        entities = self.entities
+        tile_xs = entities.tile_x
+        tile_ys = entities.tile_y
+        screen_xs = entities.screen_x
+        screen_ys = entities.screen_y
+        seen = entities.seen
+        slots = entities.slot
+        # seen is a 16-bit column; a mapped object is seen every frame or
+        # unmapped, so the wrap around does not matter
+        self._frame = (self._frame + 1) & 0xFFFF
+        frame = self._frame
+        visible = self._visible
+        visible.clear()
+        for cy in range(min_cy, max_cy + 1):
+            for cx in range(min_cx, max_cx + 1):
+                cell = self.cells.get(pack_key(cx, cy))
+                if cell is None:
+                    continue
+                for entity in cell:
+                    sx = tile_xs[entity] * tile_size - cam_left
+                    sy = tile_ys[entity] * tile_size - cam_top
+                    if (
+                        sx <= -tile_size
+                        or sx >= screen_w
+                        or sy <= -tile_size
+                        or sy >= screen_h
+                    ):
+                        continue
+                    screen_xs[entity] = sx
+                    screen_ys[entity] = sy
+                    seen[entity] = frame
+                    visible.append(entity)
+
+        # objects that left the view give their slot back
+        mapped = self._mapped
+        kept = 0
+        for entity in mapped:
+            if seen[entity] == frame:
+                mapped[kept] = entity
+                kept += 1
+            else:
+                self._unmap(entity)
+        del mapped[kept:]
+
+        # more objects in view than slots: keep the ones nearest the camera
+        budget = kept + self.pool.available
+        if len(visible) > budget:
+            center_x = self.screen_center_x - tile_size // 2
+            center_y = self.screen_center_y - tile_size // 2
+            distance = entities.distance
+            for entity in visible:
+                distance[entity] = abs(screen_xs[entity] - center_x) + abs(
+                    screen_ys[entity] - center_y
+                )
+            visible.sort(key=lambda entity: distance[entity])
+            for entity in visible[budget:]:
+                if slots[entity] >= 0:
+                    self._unmap(entity)
+                    mapped.remove(entity)
+            del visible[budget:]
+
+        for entity in visible:
+            slot = slots[entity]
+            if slot < 0:
+                slots[entity] = self.pool.acquire()
+                self._write_sprite(entity)
+                mapped.append(entity)
+                self._order.append(entity)
+                self._order_changed = True
+            else:
+                oam.set_xy(slot, screen_xs[entity], screen_ys[entity])
+
+        player = self.player
+        entities.depth[PLAYER] = player.world_y + oam.height[player.slot] // 2
+        self._sort_draw_order()
+
         # center player sprite
-        self.player_sprite.x = self.screen_center_x - self.player_sprite.width // 2
-        self.player_sprite.y = self.screen_center_y - self.player_sprite.height // 2
+        player_slot = player.slot
+        oam.set_xy(
+            player_slot,
+            self.screen_center_x - oam.width[player_slot] // 2,
+            self.screen_center_y - oam.height[player_slot] // 2,
+        )
+
+    def _sort_draw_order(self) -> None:
+        """Y-sort the sprites: the lower an OAM slot, the more on top it is
+        drawn, so whatever is nearest the bottom of the screen gets the lowest
+        slot. Between frames the order barely changes, so an insertion sort
+        of last frame's order is close to linear, and only sprites that end
+        up in a different slot are rewritten."""
+        order = self._order
+        entity_slots = self.entities.slot
+        depths = self.entities.depth
+        if self._order_changed:
+            # drop what lost its slot; new arrivals were appended at the end
+            kept = 0
+            for entity in order:
+                if entity_slots[entity] >= 0:
+                    order[kept] = entity
+                    kept += 1
+            del order[kept:]
+            slots = self._slots
+            slots.clear()
+            for entity in order:
+                slots.append(entity_slots[entity])
+            slots.sort()
+            self._order_changed = False
+
+        for i in range(1, len(order)):
+            entity = order[i]
+            depth = depths[entity]
+            j = i - 1
+            while j >= 0 and depths[order[j]] < depth:
+                order[j + 1] = order[j]
+                j -= 1
+            order[j + 1] = entity
+
+        slots = self._slots
+        player = self.player
+        # the player copies its sprite from its old slot, so it moves first,
+        # before anything else can be written over it
+        for i in range(len(order)):
+            if order[i] == PLAYER:
+                if player.slot != slots[i]:
+                    player.assign_slot(slots[i])
+                    entity_slots[PLAYER] = slots[i]
+                break
+        for i in range(len(order)):
+            entity = order[i]
+            if entity_slots[entity] != slots[i] and entity != PLAYER:
+                entity_slots[entity] = slots[i]
+                self._write_sprite(entity)